@@ -0,0 +1,244 @@
+import os
+import time
+import asyncio
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from langchain_core.embeddings import Embeddings
+
+# Lower value = served first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# Priority of API calls made from the current thread / task; refreshes switch it to BACKGROUND
+_current_priority: ContextVar[int] = ContextVar("api_priority", default=INTERACTIVE)
+
+COHERE_BATCH_SIZE = 96   # Cohere's max texts per embed request
+ASYNC_POLL_INTERVAL = 0.02   # async waiters can't block on the condition; they re-check this often
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised immediately when the queue is full, or when a wait exceeds its timeout."""
+
+
+@contextmanager
+def api_priority(priority: int):
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Takes one token and returns 0, or returns the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ApiScheduler:
+    """
+    Admission control for one upstream API: a token bucket for request rate, a cap on
+    concurrent calls, and a priority queue so interactive calls overtake background ones.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._queue: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._active = 0
+
+    def _limit(self, priority: int) -> int:
+        # Background work may only fill half the queue so interactive calls are never rejected by it
+        return self.max_queue if priority <= INTERACTIVE else max(1, self.max_queue // 2)
+
+    def _enqueue(self, priority: int) -> tuple[int, int]:
+        if len(self._queue) >= self._limit(priority):
+            raise SchedulerBusy(f"{self.name} queue full ({len(self._queue)} waiting)")
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _try_admit(self, ticket: tuple[int, int]) -> float | None:
+        """Admits `ticket` and returns 0, or returns the seconds to wait (None: until a release)."""
+        if self._queue[0] != ticket or self._active >= self.max_concurrency:
+            return None
+        wait = self.bucket.take()
+        if wait == 0:
+            heapq.heappop(self._queue)
+            self._active += 1
+            self._cond.notify_all()
+        return wait
+
+    def _abandon(self, ticket: tuple[int, int]):
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._cond.notify_all()
+
+    def acquire(self, priority: int | None = None, timeout: float | None = None):
+        priority = current_priority() if priority is None else priority
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    wait = self._try_admit(ticket)
+                    if wait == 0:
+                        return
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise SchedulerBusy(f"{self.name} admission timed out")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+
+    async def aacquire(self, priority: int | None = None, timeout: float | None = None):
+        """Like acquire, without blocking the event loop; a cancelled waiter leaves the queue."""
+        priority = current_priority() if priority is None else priority
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_admit(ticket)
+                if wait == 0:
+                    return
+                delay = ASYNC_POLL_INTERVAL if wait is None else min(wait, ASYNC_POLL_INTERVAL)
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SchedulerBusy(f"{self.name} admission timed out")
+                    delay = min(delay, remaining)
+                await asyncio.sleep(delay)
+        except BaseException:
+            with self._cond:
+                self._abandon(ticket)
+            raise
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int | None = None, timeout: float | None = None):
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def run(self, fn, *args, priority: int | None = None, timeout: float | None = None, **kwargs):
+        with self.slot(priority, timeout):
+            return fn(*args, **kwargs)
+
+    @asynccontextmanager
+    async def aslot(self, priority: int | None = None, timeout: float | None = None):
+        await self.aacquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def arun(self, fn, *args, priority: int | None = None, timeout: float | None = None, **kwargs):
+        """Awaits `fn(*args, **kwargs)` (a coroutine function) inside an admitted slot."""
+        async with self.aslot(priority, timeout):
+            return await fn(*args, **kwargs)
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+_schedulers = {
+    "cohere": ApiScheduler(
+        "cohere",
+        rate=_env_float("COHERE_RPS", 10),
+        burst=_env_float("COHERE_BURST", 10),
+        max_concurrency=int(_env_float("COHERE_MAX_CONCURRENCY", 8)),
+        max_queue=int(_env_float("COHERE_MAX_QUEUE", 64))
+    ),
+    "groq": ApiScheduler(
+        "groq",
+        rate=_env_float("GROQ_RPS", 0.5),
+        burst=_env_float("GROQ_BURST", 5),
+        max_concurrency=int(_env_float("GROQ_MAX_CONCURRENCY", 4)),
+        max_queue=int(_env_float("GROQ_MAX_QUEUE", 32))
+    )
+}
+
+
+def get_scheduler(service: str) -> ApiScheduler:
+    return _schedulers[service]
+
+
+def split_limits(parts: int):
+    """
+    Gives this process 1/`parts` of every service's rate, burst, concurrency and queue, for
+    when `parts` processes (pre-forked workers) each run their own schedulers.
+    """
+    if parts <= 1:
+        return
+    for scheduler in _schedulers.values():
+        with scheduler._cond:
+            bucket = scheduler.bucket
+            bucket.rate /= parts
+            bucket.capacity = max(1.0, bucket.capacity / parts)
+            bucket.tokens = min(bucket.tokens, bucket.capacity)
+            scheduler.max_concurrency = max(1, scheduler.max_concurrency // parts)
+            scheduler.max_queue = max(1, scheduler.max_queue // parts)
+
+
+class ScheduledEmbeddings(Embeddings):
+    """Routes every Cohere embedding request through the shared scheduler, one batch per request."""
+
+    def __init__(self, inner: Embeddings, service: str = "cohere"):
+        self.inner = inner
+        self.scheduler = get_scheduler(service)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # Split bulk work so interactive queries can be admitted between batches
+        vectors = []
+        for start in range(0, len(texts), COHERE_BATCH_SIZE):
+            batch = texts[start:start + COHERE_BATCH_SIZE]
+            vectors.extend(self.scheduler.run(self.inner.embed_documents, batch))
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.scheduler.run(self.inner.embed_query, text)
+
+    def embed(self, texts: list[str], input_type: str):
+        if not hasattr(self.inner, "embed"):
+            return self.embed_documents(texts)
+        vectors = []
+        for start in range(0, len(texts), COHERE_BATCH_SIZE):
+            batch = texts[start:start + COHERE_BATCH_SIZE]
+            vectors.extend(self.scheduler.run(self.inner.embed, batch, input_type=input_type))
+        return vectors
@@ -0,0 +1,111 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+# Typeahead over product names: exact prefixes (of the name or any word in it) score above
+# trigram similarity, which catches misspellings. Matching uses only the last few words typed.
+MAX_WINDOW_WORDS = 4
+MIN_FRAGMENT_CHARS = 3
+FULL_WEIGHT_CHARS = 12
+PREFIX_BONUS = 0.25
+MIN_SCORE = 0.4
+# Trigrams in more than this share of names (" oi", "oil") don't pick candidates: long posting
+# lists, little signal. They still count when scoring the candidates rarer trigrams found.
+MAX_GRAM_SHARE = 0.1
+MIN_GRAM_CAP = 50
+MIN_SHARED_TRIGRAMS = 3
+# A lone typed word is only a prefix hint when it is this long and not that common ("oil" is neither)
+MIN_PREFIX_WORD_CHARS = 4
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.lower())).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameCompleter:
+    """
+    Suggestions as (product name, number of trailing typed words it replaces).
+    Prefix lookups bisect a sorted list of every word-suffix of every name; trigram lookups
+    find candidates through an inverted index of the rarer trigrams, so neither scans the whole
+    catalog.
+    """
+
+    def __init__(self, names: list[str]):
+        self.names = list(dict.fromkeys(n for n in names if n))
+        self.suffixes = []
+        self.by_trigram = defaultdict(list)
+        self.name_grams = []
+        for i, name in enumerate(self.names):
+            words = normalize(name).split()
+            for start in range(len(words)):
+                self.suffixes.append((" ".join(words[start:]), i))
+            grams = trigrams(" ".join(words))
+            self.name_grams.append(grams)
+            for gram in grams:
+                self.by_trigram[gram].append(i)
+        self.suffixes.sort()
+        self.keys = [s for s, _ in self.suffixes]
+        self.gram_cap = max(MIN_GRAM_CAP, int(len(self.names) * MAX_GRAM_SHARE))
+
+    def _prefix(self, fragment: str, limit: int) -> list[int]:
+        found = []
+        pos = bisect_left(self.keys, fragment)
+        while pos < len(self.keys) and self.keys[pos].startswith(fragment) and len(found) < limit:
+            row = self.suffixes[pos][1]
+            if row not in found:
+                found.append(row)
+            pos += 1
+        return found
+
+    def _prefix_count(self, fragment: str) -> int:
+        """Word-suffixes starting with `fragment`, from two bisections."""
+        return bisect_left(self.keys, fragment + "\uffff") - bisect_left(self.keys, fragment)
+
+    def _weak_prefix(self, fragment: str) -> bool:
+        return " " not in fragment and (
+            len(fragment) < MIN_PREFIX_WORD_CHARS or self._prefix_count(fragment) > self.gram_cap
+        )
+
+    def _similar(self, fragment: str) -> list[tuple[float, int]]:
+        grams = trigrams(fragment)
+        candidates = set()
+        for gram in grams:
+            rows = self.by_trigram.get(gram, ())
+            if len(rows) <= self.gram_cap:
+                candidates.update(rows)
+        # Share of the typed fragment's trigrams found in the name
+        found = []
+        for row in candidates:
+            n = len(grams & self.name_grams[row])
+            if n >= MIN_SHARED_TRIGRAMS:
+                found.append((n / len(grams), row))
+        return found
+
+    def suggest(self, text: str, limit: int = 5) -> list[tuple[str, int]]:
+        # Windows count whitespace-separated words, as the UI replaces them
+        words = [normalize(w) for w in text.split()]
+        best = {}   # row -> (score, words replaced)
+
+        def offer(row: int, score: float, size: int):
+            if score >= MIN_SCORE and score > best.get(row, (0.0, 0))[0]:
+                best[row] = (score, size)
+
+        for size in range(min(MAX_WINDOW_WORDS, len(words)), 0, -1):
+            fragment = normalize(" ".join(words[-size:]))
+            if len(fragment) < MIN_FRAGMENT_CHARS:
+                continue
+            # A few typed characters are weak evidence; longer fragments count fully
+            weight = min(1.0, len(fragment) / FULL_WEIGHT_CHARS)
+            if not self._weak_prefix(fragment):
+                for row in self._prefix(fragment, limit):
+                    offer(row, min(1.0, weight + PREFIX_BONUS), size)
+            for score, row in self._similar(fragment):
+                offer(row, score * weight, size)
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], self.names[item[0]]))
+        return [(self.names[row], size) for row, (_, size) in ranked[:limit]]
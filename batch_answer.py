@@ -0,0 +1,192 @@
+"""
+Headless batch answering: streams a JSONL file of queries through the RAG pipeline.
+
+    python batch_answer.py queries.jsonl results.jsonl --concurrency 8 [--unordered] [--restart]
+
+Each input line is {"id": ..., "query": "...", "history": [...]} ("id" and "history" optional).
+Results are appended to the output as they complete, so an interrupted run resumes where it stopped;
+malformed lines and failed queries are recorded as errors and retried on the next run.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Only the pipeline is imported; the Tk UI never loads in batch mode.
+from rag_chain import aask_bot
+from intent_utils import ConversationState
+
+
+def read_queries(path: str):
+    """
+    (index, item, problem) per non-blank line; `problem` describes a line that can't be asked.
+    Lines that aren't a query at all get a "line N" id, which can't collide with real ids.
+    """
+    with open(path, encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                yield index, {"id": f"line {index + 1}"}, f"Malformed JSON: {e}"
+                continue
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict):
+                yield index, {"id": f"line {index + 1}"}, "Expected a query string or object"
+                continue
+            item.setdefault("id", index)
+            if not isinstance(item.get("query"), str):
+                yield index, item, "Missing 'query' string"
+                continue
+            yield index, item, None
+
+
+def read_checkpoint(path: str) -> set[str]:
+    """Ids already answered in the results file; errors are retried."""
+    done = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                    if result.get("answer") is not None:
+                        done.add(str(result["id"]))
+                except (ValueError, KeyError, AttributeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def error_result(item: dict, error: str) -> dict:
+    return {"id": item.get("id"), "query": item.get("query"), "answer": None, "error": error, "seconds": 0.0}
+
+
+async def answer_one(item: dict) -> dict:
+    # Every query gets its own conversation so concurrent answers never share follow-up memory
+    start = time.perf_counter()
+    result = {"id": item.get("id"), "query": item.get("query"), "answer": None, "error": None}
+    try:
+        result["answer"] = await aask_bot(item["query"], item.get("history", []), ConversationState())
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+class ResultWriter:
+    """Appends results, either as they finish or re-sequenced into input order."""
+
+    def __init__(self, path: str, ordered: bool):
+        self.file = open(path, "a", encoding="utf-8")
+        self.ordered = ordered
+        self.pending: dict[int, dict] = {}
+        self.next_index = 0
+        self.timings: list[float] = []
+        self.errors = 0
+
+    def skip(self, index: int):
+        self.add(index, None)
+
+    def add(self, index: int, result: dict | None):
+        if result is not None:
+            self.timings.append(result["seconds"])
+            self.errors += result["error"] is not None
+        if not self.ordered:
+            self._write(result)
+            return
+        self.pending[index] = result
+        while self.next_index in self.pending:
+            self._write(self.pending.pop(self.next_index))
+            self.next_index += 1
+
+    def _write(self, result: dict | None):
+        if result is None:
+            return
+        self.file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        # Blank input lines leave index gaps; flush whatever is still buffered
+        for index in sorted(self.pending):
+            self._write(self.pending[index])
+        self.pending.clear()
+        self.file.close()
+
+
+async def run_batch(input_path: str, output_path: str, concurrency: int, ordered: bool, resume: bool):
+    done = read_checkpoint(output_path) if resume else set()
+    if not resume:
+        open(output_path, "w").close()
+
+    # Queries run as tasks on this loop; only blocking store reads go to the executor
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    writer = ResultWriter(output_path, ordered)
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+    started = time.perf_counter()
+
+    async def worker(index: int, item: dict):
+        try:
+            result = await answer_one(item)
+            writer.add(index, result)
+            print(f"[BATCH] #{index} {result['seconds']:.2f}s {'ERROR' if result['error'] else 'ok'}")
+        finally:
+            slots.release()
+
+    last_index = -1
+    for index, item, problem in read_queries(input_path):
+        # Fill index gaps left by blank lines so ordered output never stalls
+        for gap in range(last_index + 1, index):
+            writer.skip(gap)
+        last_index = index
+        if str(item["id"]) in done:
+            writer.skip(index)
+            continue
+        if problem:
+            writer.add(index, error_result(item, problem))
+            print(f"[BATCH] #{index} ERROR {problem}")
+            continue
+        # Acquire before creating the task so at most `concurrency` queries are in memory
+        await slots.acquire()
+        task = asyncio.create_task(worker(index, item))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    timings = sorted(writer.timings)
+    if timings:
+        p50 = timings[len(timings) // 2]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"✅ Answered {len(timings)} queries in {elapsed:.1f}s "
+              f"({writer.errors} errors, p50 {p50:.2f}s, p95 {p95:.2f}s, {len(done)} resumed)")
+    else:
+        print(f"📭 Nothing to answer ({len(done)} already in `{output_path}`).")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of queries without the UI.")
+    parser.add_argument("input", help="JSONL file with one query per line")
+    parser.add_argument("output", help="JSONL results file (appended; used as the checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="queries answered at once")
+    parser.add_argument("--unordered", action="store_true", help="write results as they finish")
+    parser.add_argument("--restart", action="store_true", help="ignore and overwrite existing results")
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    asyncio.run(run_batch(args.input, args.output, args.concurrency, not args.unordered, not args.restart))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
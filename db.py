@@ -1,6 +1,11 @@
-from live_scraper import crawl_product_pages, scrape_product_page
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from live_scraper import crawl_product_pages, scrape_product_page, compute_hash
 from bs4 import BeautifulSoup
-import requests
+from ingest_utils import extract_main_text, strip_template_lines, drop_near_duplicates
+from facet_index import extract_attributes
+import http_cache
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
@@ -15,38 +20,150 @@ GENERAL_PAGES = {
     "home": "https://www.silvestreph.com/"
 }
 
-def load_all_documents():
-    documents = []
+# Product descriptions are stored whole as parents; only small children are embedded
+# written one JSON record per line as pages stream in; older versions have a single JSON object
+PARENTS_FILENAME = "parents.jsonl"
+LEGACY_PARENTS_FILENAME = "parents.json"
+CHILD_CHUNK_SIZE = 400
+SCRAPE_WORKERS = 8
 
-    # -- Load Product Pages --
-    product_urls = crawl_product_pages()
-    for url, category in product_urls:
-        data = scrape_product_page(url, category)
-        if data:
-            doc = Document(
-                page_content=data["description"],
-                metadata={
-                    "name": data["name"],
-                    "url": data["url"],
-                    "category": data["category"],
-                    "type": "product",
-                    "price": data["price"]
-                }
-            )
-            documents.append(doc)
 
-    # -- Load General Pages --
+def product_parent_id(url: str) -> str:
+    return compute_hash(url)
+
+
+def split_product(data: dict, parent_id: str) -> list[Document]:
+    """One child per product when the description is short, otherwise non-overlapping pieces."""
+    description = data["description"]
+    if len(description) <= CHILD_CHUNK_SIZE:
+        pieces = [description]
+    else:
+        splitter = RecursiveCharacterTextSplitter(chunk_size=CHILD_CHUNK_SIZE, chunk_overlap=0)
+        pieces = splitter.split_text(description)
+
+    metadata = {
+        "name": data["name"],
+        "url": data["url"],
+        "category": data["category"],
+        "type": "product",
+        "price": data["price"],
+        "parent_id": parent_id
+    }
+    # Prefix the name so every child is retrievable by product name on its own
+    return [
+        Document(page_content=f"{data['name']}\n{piece}", metadata=dict(metadata))
+        for piece in pieces
+    ]
+
+
+def record_digest(record: dict) -> str:
+    return compute_hash(json.dumps(record, sort_keys=True, ensure_ascii=False))
+
+
+class ParentsWriter:
+    """
+    Appends parent records to a version's parents file as they arrive, so full descriptions
+    are not held in memory. Keeps only name/url (for the name index) and a digest per record
+    (to tell whether a refresh changed it). Published by close().
+    """
+
+    def __init__(self, store_path: str):
+        os.makedirs(store_path, exist_ok=True)
+        self.path = os.path.join(store_path, PARENTS_FILENAME)
+        self.tmp = f"{self.path}.tmp"
+        self.file = open(self.tmp, "w", encoding="utf-8")
+        self.summaries: dict[str, dict] = {}
+        self.digests: dict[str, str] = {}
+
+    def write(self, parents: dict[str, dict]):
+        for parent_id, record in parents.items():
+            self.file.write(json.dumps({"parent_id": parent_id, **record}, ensure_ascii=False) + "\n")
+            self.summaries[parent_id] = {"name": record.get("name", ""), "url": record.get("url", "")}
+            self.digests[parent_id] = record_digest(record)
+
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def save_parents(store_path: str, parents: dict[str, dict]):
+    writer = ParentsWriter(store_path)
+    writer.write(parents)
+    writer.close()
+
+
+def iter_parents(store_path: str):
+    """(parent_id, record) pairs, one line at a time; a later line for the same id wins."""
+    try:
+        with open(os.path.join(store_path, PARENTS_FILENAME), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.pop("parent_id"), record
+        return
+    except FileNotFoundError:
+        pass
+    try:
+        with open(os.path.join(store_path, LEGACY_PARENTS_FILENAME), encoding="utf-8") as f:
+            yield from json.load(f).items()
+    except FileNotFoundError:
+        return
+
+
+def load_parents(store_path: str) -> dict[str, dict]:
+    return dict(iter_parents(store_path))
+
+
+def product_record(data: dict) -> dict:
+    return {
+        "name": data["name"],
+        "url": data["url"],
+        "category": data["category"],
+        "type": "product",
+        "price": data["price"],
+        "description": data["description"],
+        "attributes": extract_attributes(data)
+    }
+
+
+def iter_product_pages(product_urls):
+    """Scrapes product pages on a small thread pool, yielding each result as soon as it is ready."""
+    with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as pool:
+        pending = set()
+        for url, category in product_urls:
+            pending.add(pool.submit(scrape_product_page, url, category))
+            # Keep only a bounded window of pages in flight
+            if len(pending) >= SCRAPE_WORKERS * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def load_general_pages() -> list[Document]:
+    documents = []
     headers = {"User-Agent": "Mozilla/5.0"}
+    seen_urls = set()
     for label, url in GENERAL_PAGES.items():
+        # Several labels can point at the same page (e.g. blog/partners); fetch and embed it once
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
         try:
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = http_cache.fetch(url, headers=headers, timeout=10)
 
             if resp.status_code == 404:
                 print(f"[⚠️] Skipping 404 page: {url}")
                 continue
 
             soup = BeautifulSoup(resp.text, "html.parser")
-            text = soup.get_text(separator="\n", strip=True)
+            text = extract_main_text(soup)
 
             # 🧹 Skip pages that clearly contain product listings
             if "add to cart" in text.lower() and "price" in text.lower():
@@ -67,12 +184,40 @@ def load_all_documents():
         except Exception as e:
             print(f"[WARN] Failed to load general page '{label}': {e}")
 
-    # -- Chunking All Documents --
+    # -- Strip template text shared across general pages --
+    for doc, text in zip(documents, strip_template_lines([d.page_content for d in documents])):
+        doc.page_content = text
+
+    return documents
+
+
+def iter_documents():
+    """
+    Yields (child chunks, {parent_id: parent record}) page by page, so callers can embed and
+    store while scraping continues. General pages come last as one group: template
+    stripping needs all of them, and there are only a handful.
+    """
+    # -- Product Pages --
+    for data in iter_product_pages(crawl_product_pages()):
+        if data:
+            parent_id = product_parent_id(data["url"])
+            yield split_product(data, parent_id), {parent_id: product_record(data)}
+
+    # -- General Pages (products are already split per parent) --
     splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-    chunked_docs = splitter.split_documents(documents)
+    yield drop_near_duplicates(splitter.split_documents(load_general_pages())), {}
+
+
+def load_all_documents():
+    """Returns (child chunks to embed, parent product records keyed by parent_id)."""
+    chunked_docs = []
+    parents = {}
+    for chunks, new_parents in iter_documents():
+        chunked_docs.extend(chunks)
+        parents.update(new_parents)
 
-    print(f"✅ Loaded and chunked {len(chunked_docs)} total documents.")
-    return chunked_docs
+    print(f"✅ Loaded {len(parents)} products and chunked {len(chunked_docs)} total documents.")
+    return chunked_docs, parents
 
 
 def get_all_product_names() -> list[str]:
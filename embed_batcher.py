@@ -0,0 +1,106 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+
+# Query texts arriving within the window (or until the batch is full) share one embed request
+BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "10"))
+BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX", "32"))
+BATCH_MAX_IN_FLIGHT = int(os.getenv("EMBED_BATCH_IN_FLIGHT", "4"))
+
+
+class MicroBatchEmbeddings(Embeddings):
+    """
+    Coalesces concurrent `embed_query` calls into batched requests. Each caller blocks on
+    (or awaits) its own future; a window of 0 ms disables batching.
+    """
+
+    def __init__(self, inner: Embeddings, window_ms: float = BATCH_WINDOW_MS,
+                 max_batch: int = BATCH_MAX_SIZE, max_in_flight: int = BATCH_MAX_IN_FLIGHT):
+        self.inner = inner
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._pool = None
+
+    def _ensure_worker(self):
+        # Started lazily, and again in forked children (threads don't survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="embed-batch")
+            threading.Thread(target=self._collect, name="embed-batcher", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._pool.submit(self._dispatch, batch)
+
+    def _embed_queries(self, texts: list[str]) -> list[list[float]]:
+        embed = getattr(self.inner, "embed", None)
+        if embed is not None:
+            return embed(texts, input_type="search_query")
+        return [self.inner.embed_query(t) for t in texts]
+
+    def _dispatch(self, batch: list[tuple[str, Future]]):
+        # Drop callers that were cancelled while queued (e.g. an abandoned aask_bot)
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(unique, self._embed_queries(unique)))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        if len(batch) > 1:
+            print(f"[EMBED BATCH] {len(batch)} queries in one request ({len(unique)} unique)")
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        if self.window <= 0:
+            future.set_result(self.inner.embed_query(text))
+            return future
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        if self.window <= 0:
+            return await asyncio.to_thread(self.inner.embed_query, text)
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # Document embedding is already batched by the caller
+        return self.inner.embed_documents(texts)
+
+    def embed(self, texts: list[str], input_type: str):
+        embed = getattr(self.inner, "embed", None)
+        if embed is None:
+            return self.inner.embed_documents(texts)
+        return embed(texts, input_type=input_type)
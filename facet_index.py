@@ -0,0 +1,204 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+# Typed product attributes, extracted once at scrape time and kept on the parent record,
+# so filter questions ("SAE 40 engine oils under ₱2,000", "marine grease") are answered by
+# set/range lookups instead of semantic search over descriptions.
+MAX_FILTER_RESULTS = 15
+
+PRICE_VALUE = re.compile(r"(\d[\d,]*(?:\.\d+)?)")
+MULTIGRADE = re.compile(r"\b(\d{1,2})\s*W\s*[-–]?\s*(\d{2,3})\b", re.IGNORECASE)
+SAE_GRADE = re.compile(r"\bSAE\s*(\d{2,3})\b(?!\s*W)", re.IGNORECASE)
+ISO_VG = re.compile(r"\b(?:ISO\s*)?VG\s*(\d{2,4})\b", re.IGNORECASE)
+NLGI = re.compile(r"\bNLGI\s*(?:No\.?\s*|#\s*|grade\s*)?(\d{1,3})\b", re.IGNORECASE)
+PACK_SIZE = re.compile(
+    r"\b(\d+(?:\.\d+)?)\s*-?\s*(ml|l|liters?|litres?|kg|kilos?|g|grams?|gal|gallons?)\b", re.IGNORECASE
+)
+PACK_UNITS = {
+    "ml": ("L", 0.001), "l": ("L", 1), "liter": ("L", 1), "liters": ("L", 1), "litre": ("L", 1), "litres": ("L", 1),
+    "g": ("kg", 0.001), "gram": ("kg", 0.001), "grams": ("kg", 0.001),
+    "kg": ("kg", 1), "kilo": ("kg", 1), "kilos": ("kg", 1),
+    "gal": ("L", 3.785), "gallon": ("L", 3.785), "gallons": ("L", 3.785),
+}
+
+# Query price constraints; a trailing "k" means thousands, and amounts followed by a unit are sizes
+_AMOUNT = (
+    r"(?:₱|php|p)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k)?\b"
+    r"(?!\s*(?:ml|l|liters?|litres?|kg|kilos?|g|grams?|gal|gallons?|w|%)\b)"
+)
+PRICE_BETWEEN = re.compile(rf"\bbetween\s+{_AMOUNT}\s*(?:and|to|-)\s*{_AMOUNT}", re.IGNORECASE)
+PRICE_MAX = re.compile(rf"(?:\b(?:under|below|less than|cheaper than|at most|up to|max(?:imum)?)|<)\s*{_AMOUNT}", re.IGNORECASE)
+PRICE_MIN = re.compile(rf"(?:\b(?:over|above|more than|at least|starting at|min(?:imum)?)|>)\s*{_AMOUNT}", re.IGNORECASE)
+
+# Bare type words only count as a filter when the question asks for a listing
+LISTING_WORDING = re.compile(
+    r"\b(do you (?:have|sell|carry|offer)|list|show me|what (?:kinds?|types?|options)|which|"
+    r"all (?:of )?(?:your|the)|your \w+s\b|options)\b",
+    re.IGNORECASE
+)
+
+# Words that narrow by product type or category when they appear in a product's name or category
+FACET_TERMS = {
+    "industrial", "automotive", "marine", "grease", "specialty", "motorcycle", "tire",
+    "engine", "gear", "hydraulic", "transmission", "diesel", "gasoline", "compressor", "turbine",
+    "coolant", "brake", "atf", "synthetic", "2t", "4t", "outboard", "chain", "cutting",
+}
+
+
+def _tokens(text: str) -> set[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    # "oils"/"greases"/"tires" match their singular form
+    return {w[:-1] if w.endswith("s") and w[:-1] in FACET_TERMS else w for w in words}
+
+
+def parse_price(price: str) -> float | None:
+    match = PRICE_VALUE.search(price or "")
+    if not match:
+        return None
+    try:
+        return float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def extract_grades(text: str) -> list[str]:
+    grades = []
+    for low, high in MULTIGRADE.findall(text):
+        grades.append(f"{int(low)}W-{int(high)}")
+    grades += [f"SAE {g}" for g in SAE_GRADE.findall(text)]
+    grades += [f"ISO VG {g}" for g in ISO_VG.findall(text)]
+    grades += [f"NLGI {g}" for g in NLGI.findall(text)]
+    return list(dict.fromkeys(grades))
+
+
+def extract_pack_sizes(text: str) -> list[str]:
+    sizes = []
+    for amount, unit in PACK_SIZE.findall(text):
+        base, factor = PACK_UNITS[unit.lower()]
+        sizes.append(f"{float(amount) * factor:g}{base}")
+    return list(dict.fromkeys(sizes))
+
+
+def extract_attributes(data: dict) -> dict:
+    """Typed attributes from a scraped product page (see live_scraper.scrape_product_page)."""
+    text = f"{data.get('name', '')}\n{data.get('description', '')}"
+    return {
+        "price_value": parse_price(data.get("price", "")),
+        "grades": extract_grades(text),
+        "pack_sizes": extract_pack_sizes(text),
+        "category": data.get("category", "Uncategorized"),
+    }
+
+
+def _amount(value: str, thousands: str) -> float:
+    return float(value.replace(",", "")) * (1000 if thousands else 1)
+
+
+def parse_filter_query(query: str, loose: bool = False) -> dict | None:
+    """
+    Returns the facet constraints in a question, or None when it has none. Type words alone
+    ("gear", "engine") need listing wording, unless `loose` (used once name matching has failed).
+    """
+    filters = {}
+    between = PRICE_BETWEEN.search(query)
+    if between:
+        low, high = _amount(*between.group(1, 2)), _amount(*between.group(3, 4))
+        filters["min_price"], filters["max_price"] = min(low, high), max(low, high)
+    else:
+        upper = PRICE_MAX.search(query)
+        lower = PRICE_MIN.search(query)
+        if upper:
+            filters["max_price"] = _amount(*upper.group(1, 2))
+        if lower:
+            filters["min_price"] = _amount(*lower.group(1, 2))
+
+    grades = extract_grades(query)
+    if grades:
+        filters["grades"] = grades
+    sizes = extract_pack_sizes(query)
+    if sizes:
+        filters["pack_sizes"] = sizes
+    terms = sorted(_tokens(query) & FACET_TERMS)
+    if terms and (filters or loose or LISTING_WORDING.search(query)):
+        filters["terms"] = terms
+    return filters or None
+
+
+def describe_filters(filters: dict) -> str:
+    parts = [*filters.get("grades", []), *filters.get("terms", []), *filters.get("pack_sizes", [])]
+    if "min_price" in filters and "max_price" in filters:
+        parts.append(f"₱{filters['min_price']:,.0f}–₱{filters['max_price']:,.0f}")
+    elif "max_price" in filters:
+        parts.append(f"under ₱{filters['max_price']:,.0f}")
+    elif "min_price" in filters:
+        parts.append(f"over ₱{filters['min_price']:,.0f}")
+    return ", ".join(parts)
+
+
+class FacetIndex:
+    """
+    In-memory facets over one snapshot's product records: inverted sets for grade, pack size
+    and name/category terms, and a price-sorted array for range lookups.
+    """
+
+    def __init__(self, records: list[dict]):
+        self.records = []
+        self.by_grade = defaultdict(set)
+        self.by_pack = defaultdict(set)
+        self.by_term = defaultdict(set)
+        priced = []
+
+        seen = set()
+        for record in records:
+            key = record.get("parent_id") or record.get("url") or record.get("name")
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            attributes = record.get("attributes") or extract_attributes(record)
+            row = len(self.records)
+            self.records.append(record)
+
+            for grade in attributes.get("grades", []):
+                self.by_grade[grade].add(row)
+                # A multigrade oil also answers for its hot grade ("SAE 40" finds 15W-40)
+                if "W-" in grade:
+                    self.by_grade[f"SAE {grade.split('-', 1)[1]}"].add(row)
+            for size in attributes.get("pack_sizes", []):
+                self.by_pack[size].add(row)
+            for term in _tokens(f"{record.get('name', '')} {attributes.get('category', '')}") & FACET_TERMS:
+                self.by_term[term].add(row)
+            if attributes.get("price_value") is not None:
+                priced.append((attributes["price_value"], row))
+
+        priced.sort()
+        self.prices = [p for p, _ in priced]
+        self.price_rows = [r for _, r in priced]
+        self.price_of = {r: p for p, r in priced}
+
+    def price_range(self, low: float | None = None, high: float | None = None) -> set[int]:
+        start = bisect_left(self.prices, low) if low is not None else 0
+        end = bisect_right(self.prices, high) if high is not None else len(self.prices)
+        return set(self.price_rows[start:end])
+
+    def search(self, filters: dict) -> list[dict]:
+        """Records matching every constraint, cheapest first (unpriced products last)."""
+        candidates = None
+
+        def narrow(rows: set[int]):
+            nonlocal candidates
+            candidates = rows if candidates is None else candidates & rows
+
+        if "min_price" in filters or "max_price" in filters:
+            narrow(self.price_range(filters.get("min_price"), filters.get("max_price")))
+        if filters.get("grades"):
+            narrow(set().union(*(self.by_grade.get(g, set()) for g in filters["grades"])))
+        if filters.get("pack_sizes"):
+            narrow(set().union(*(self.by_pack.get(s, set()) for s in filters["pack_sizes"])))
+        for term in filters.get("terms", []):
+            narrow(self.by_term.get(term, set()))
+        if not candidates:
+            return []
+
+        ordered = sorted(candidates, key=lambda r: (r not in self.price_of, self.price_of.get(r, 0.0), r))
+        return [self.records[r] for r in ordered]
@@ -0,0 +1,77 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import requests
+
+# off     - always fetch live (default)
+# record  - serve from the cache, fetching and storing anything missing
+# replay  - serve only from the cache; a missing URL is an error (offline runs, fixtures)
+# refresh - always fetch live and overwrite the cached copy
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "off").lower()
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+MODES = ("off", "record", "replay", "refresh")
+
+_session = requests.Session()
+
+
+class CacheMiss(requests.RequestException):
+    """Raised in replay mode for a URL that was never recorded."""
+
+
+class CachedResponse:
+    """The subset of `requests.Response` the scrapers use."""
+
+    def __init__(self, url: str, status_code: int, text: str):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+
+
+def cache_path(url: str) -> str:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(HTTP_CACHE_DIR, key[:2], f"{key}.json.gz")
+
+
+def _read(url: str) -> CachedResponse | None:
+    try:
+        with gzip.open(cache_path(url), "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    return CachedResponse(entry["url"], entry["status_code"], entry["text"])
+
+
+def _write(url: str, response) -> None:
+    path = cache_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump({
+            "url": url,
+            "status_code": response.status_code,
+            "text": response.text,
+            "fetched_at": time.time()
+        }, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def fetch(url: str, headers: dict | None = None, timeout: float = 10, mode: str | None = None):
+    """GET `url` according to the cache mode; returns an object with `.status_code` and `.text`."""
+    mode = (mode or HTTP_CACHE_MODE)
+    if mode not in MODES:
+        raise ValueError(f"Unknown HTTP_CACHE_MODE: {mode}")
+
+    if mode in ("record", "replay"):
+        cached = _read(url)
+        if cached is not None:
+            return cached
+        if mode == "replay":
+            raise CacheMiss(f"No recorded response for {url}")
+
+    response = _session.get(url, headers=headers, timeout=timeout)
+    # Server errors are transient; don't pin them into the cache
+    if mode in ("record", "refresh") and response.status_code < 500:
+        _write(url, response)
+    return response
@@ -0,0 +1,86 @@
+import re
+import hashlib
+from collections import Counter
+from langchain_core.documents import Document
+
+# Page furniture that never carries answerable content
+BOILERPLATE_TAGS = ["nav", "header", "footer", "script", "style", "noscript", "aside", "form", "iframe"]
+BOILERPLATE_HINTS = re.compile(r"cookie|consent|newsletter|site_header|site_footer", re.IGNORECASE)
+
+# A line found on at least this share of pages (and on 2+ pages) is treated as template text
+TEMPLATE_LINE_RATIO = 0.5
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8
+NEAR_DUPLICATE_DISTANCE = 6
+
+
+def extract_main_text(soup) -> str:
+    """Page text without navigation, footers, scripts and cookie banners."""
+    for tag in soup.find_all(BOILERPLATE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(attrs={"id": BOILERPLATE_HINTS}):
+        tag.decompose()
+    for tag in soup.find_all(class_=BOILERPLATE_HINTS):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+def strip_template_lines(texts: list[str]) -> list[str]:
+    """Removes lines repeated across many pages (menus, footers the HTML pass missed)."""
+    if len(texts) < 2:
+        return texts
+    counts = Counter(line for text in texts for line in set(text.splitlines()))
+    threshold = max(2, TEMPLATE_LINE_RATIO * len(texts))
+    template = {line for line, n in counts.items() if n >= threshold}
+    if template:
+        print(f"[🧹] Stripping {len(template)} template lines shared across pages")
+    return ["\n".join(l for l in text.splitlines() if l not in template) for text in texts]
+
+
+def simhash(text: str, bits: int = SIMHASH_BITS) -> int:
+    """64-bit SimHash over word 3-shingles."""
+    words = re.findall(r"\w+", text.lower())
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * bits
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.md5(shingle.encode("utf-8")).digest()[:8], "big")
+        for i in range(bits):
+            weights[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i, w in enumerate(weights) if w > 0)
+
+
+class NearDuplicateFilter:
+    """
+    Remembers SimHash fingerprints and flags texts within a small Hamming distance.
+    Fingerprints are bucketed by band, so a distance <= bands - 1 always shares a bucket.
+    """
+
+    def __init__(self, max_distance: int = NEAR_DUPLICATE_DISTANCE, bands: int = SIMHASH_BANDS):
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = SIMHASH_BITS // bands
+        self.buckets: list[dict[int, list[int]]] = [{} for _ in range(bands)]
+
+    def _band_keys(self, fingerprint: int):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def seen(self, text: str) -> bool:
+        """Returns True for a near-duplicate; otherwise records the text and returns False."""
+        fingerprint = simhash(text)
+        keys = self._band_keys(fingerprint)
+        for band, key in enumerate(keys):
+            for other in self.buckets[band].get(key, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return True
+        for band, key in enumerate(keys):
+            self.buckets[band].setdefault(key, []).append(fingerprint)
+        return False
+
+
+def drop_near_duplicates(docs: list[Document], dedupe: NearDuplicateFilter | None = None) -> list[Document]:
+    dedupe = dedupe or NearDuplicateFilter()
+    kept = [d for d in docs if d.page_content.strip() and not dedupe.seen(d.page_content)]
+    if len(kept) < len(docs):
+        print(f"[🧹] Dropped {len(docs) - len(kept)} empty or near-duplicate chunks")
+    return kept
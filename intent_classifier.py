@@ -0,0 +1,134 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+# Example phrasings per intent; their mean embedding is the intent centroid.
+INTENT_EXAMPLES = {
+    "list_products": [
+        "what are your products", "list your products", "show me your products",
+        "can i see your products", "what products do you have", "what do you sell",
+        "show me your catalog", "what lubricants do you carry"
+    ],
+    "followup": [
+        "how much is it", "what's the price", "how much does that cost",
+        "is it available in pails and drums", "what sizes does it come in",
+        "do you have this in stock", "what packaging is available", "where can i buy it",
+        "can i order this one", "send me the link to that product"
+    ],
+    "product": [
+        "tell me about your SAE 40 engine oil", "do you have gear oil", "I need a grease for bearings",
+        "which synthetic oil is good for my car", "recommend a marine lubricant",
+        "motorcycle oil for scooters", "do you sell motorcycle tires", "hydraulic oil for machinery",
+        "transmission fluid", "bentonite grease"
+    ],
+    "about": [
+        "tell me about your company", "what is your mission and vision", "who are you",
+        "how did silvestre start", "what is your company's history and journey",
+        "what does your company promise customers"
+    ],
+    "contact": [
+        "how can i contact you", "what is your phone number", "what is your email address",
+        "how do i reach customer service", "where is your office located", "i want to talk to support"
+    ],
+    "shipping": [
+        "do you ship nationwide", "how long is delivery", "what is your return policy",
+        "how much is shipping", "can i return an item"
+    ],
+    "faq": [
+        "i need help", "frequently asked questions", "how do i place an order", "what payment methods do you accept"
+    ],
+    "tracking": [
+        "where is my order", "how do i track my order", "what is my order status", "track my package"
+    ],
+    "blog": [
+        "do you have a blog", "any news or articles", "latest updates from silvestre"
+    ],
+    "partners": [
+        "who are your partners", "do you have partnerships", "can i become a distributor"
+    ]
+}
+
+CACHE_PATH = "intent_centroids.npz"
+MIN_SCORE = float(os.getenv("INTENT_MIN_SCORE", "0.45"))
+MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.03"))
+
+
+class IntentClassifier:
+    """
+    Nearest-centroid intent classifier over the same query embedding the retriever uses.
+    Centroids are embedded once and cached on disk, so classification is a single matrix product.
+    """
+
+    def __init__(self, embeddings, model_name: str, cache_path: str = CACHE_PATH):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.labels: list[str] = []
+        self.centroids = None
+        self._lock = threading.Lock()
+
+    def _cache_key(self) -> str:
+        payload = json.dumps([self.model_name, INTENT_EXAMPLES], sort_keys=True)
+        return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+    def _embed_examples(self, texts: list[str]) -> list[list[float]]:
+        # Embed examples as queries so they live in the same space as user questions
+        embed = getattr(self.embeddings, "embed", None)
+        if embed is not None:
+            return embed(texts, input_type="search_query")
+        return self.embeddings.embed_documents(texts)
+
+    def _load(self):
+        key = self._cache_key()
+        if os.path.exists(self.cache_path):
+            try:
+                cached = np.load(self.cache_path, allow_pickle=False)
+                if str(cached["key"]) == key:
+                    self.labels = [str(l) for l in cached["labels"]]
+                    self.centroids = cached["centroids"]
+                    return
+            except Exception as e:
+                print("[WARN] Ignoring unreadable intent centroid cache:", e)
+
+        print("[INFO] Embedding intent examples (one-time)...")
+        labels = list(INTENT_EXAMPLES)
+        texts = [t for label in labels for t in INTENT_EXAMPLES[label]]
+        vectors = np.asarray(self._embed_examples(texts), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        centroids, start = [], 0
+        for label in labels:
+            count = len(INTENT_EXAMPLES[label])
+            centroids.append(vectors[start:start + count].mean(axis=0))
+            start += count
+        centroids = np.stack(centroids)
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+
+        np.savez(self.cache_path, key=np.array(key), labels=np.array(labels), centroids=centroids)
+        self.labels, self.centroids = labels, centroids
+
+    def ensure_loaded(self):
+        if self.centroids is None:
+            with self._lock:
+                if self.centroids is None:
+                    self._load()
+
+    def classify(self, query_vector) -> tuple[str | None, float]:
+        """
+        Returns (intent, score), or (None, score) when no centroid is a confident match.
+        Never loads centroids itself (that makes blocking API calls): (None, 0.0) until
+        ensure_loaded() has succeeded.
+        """
+        if self.centroids is None:
+            return None, 0.0
+
+        q = np.asarray(query_vector, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        scores = self.centroids @ q
+        order = np.argsort(scores)[::-1]
+        best, runner_up = scores[order[0]], scores[order[1]]
+        if best < MIN_SCORE or best - runner_up < MIN_MARGIN:
+            return None, float(best)
+        return self.labels[order[0]], float(best)
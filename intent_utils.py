@@ -1,23 +1,66 @@
 import re
 from db import get_all_product_names
 
-# Track follow-up state
-last_intent = None
-followup_count = 0
 MAX_FOLLOWUPS = 3
 
 
+class ConversationState:
+    """Follow-up memory for one conversation; the desktop UI shares `default_state`."""
+
+    def __init__(self):
+        self.last_intent = None
+        self.followup_count = 0
+        self.last_product_doc = None
+
+
+default_state = ConversationState()
+
+# Keyword lists used when the embedding classifier is unavailable or unsure
+FOLLOWUP_KEYWORDS = (
+    "how much", "price", "cost", "is it available in pails and drums", "does it",
+    "what size", "where", "can i", "do you offer", "does this product",
+    "availability", "volume", "packaging", "what’s the", "do you have this"
+)
+
+PRODUCT_KEYWORDS = (
+    "engine oil", "lubricant", "gear oil", "grease", "synthetic",
+    "tire", "transmission", "bentonite", "product", "oil"
+)
+
+GENERAL_KEYWORDS = {
+    "contact": ("contact", "how can i contact", "how do i contact", "get in touch", "phone", "email", "reach", "call", "location", "address"),
+    "about": ("about", "mission", "vision", "company", "who are you"),
+    "shipping": ("shipping", "delivery", "returns"),
+    "warranty": ("warranty", "guarantee"),
+    "terms": ("terms", "conditions"),
+    "privacy": ("privacy", "data policy"),
+    "faq": ("faq", "help", "common questions"),
+    "tracking": ("track", "tracking", "order status"),
+    "blog": ("blog", "news", "articles"),
+    "partners": ("partners", "partnerships"),
+    "home": ("home", "homepage")
+}
+
+LIST_PRODUCTS_KEYWORDS = (
+    "what are your products", "list your products",
+    "show me your products", "can i see your products",
+    "what products do you have"
+)
+
+ABOUT_PAGE_KEYWORDS = ("journey", "growth", "promise", "mission", "vision", "offer", "beginnings")
+
+CONTACT_PAGE_KEYWORDS = (
+    "contact", "phone", "email", "reach you", "get in touch", "how do i contact", "customer service",
+    "call you", "message", "speak with someone", "talk to support", "contact your company"
+)
+
+
 def is_followup_question(query: str) -> bool:
     """
     Determines if the question sounds like a follow-up to a product discussion.
     """
     query_lower = query.lower()
-    followup_keywords = [
-        "how much", "price", "cost", "is it available in pails and drums", "does it",
-        "what size", "where", "can i", "do you offer", "does this product",
-        "availability", "volume", "packaging", "what’s the", "do you have this"
-    ]
-    return any(keyword in query_lower for keyword in followup_keywords)
+    return any(keyword in query_lower for keyword in FOLLOWUP_KEYWORDS)
 
 
 def extract_product_name(response: str) -> str:
@@ -60,29 +103,11 @@ def detect_intent(text: str) -> str:
         return "about"
 
     # Priority 3: Product-like keywords
-    product_keywords = [
-        "engine oil", "lubricant", "gear oil", "grease", "synthetic",
-        "tire", "transmission", "bentonite", "product", "oil"
-    ]
-    if any(kw in text_lower for kw in product_keywords):
+    if any(kw in text_lower for kw in PRODUCT_KEYWORDS):
         return "product"
 
     # Priority 4: General keyword mapping
-    general_keywords = {
-        "contact": ["contact", "how can i contact", "how do i contact", "get in touch", "phone", "email", "reach", "call", "location", "address"],
-        "about": ["about", "mission", "vision", "company", "who are you"],
-        "shipping": ["shipping", "delivery", "returns"],
-        "warranty": ["warranty", "guarantee"],
-        "terms": ["terms", "conditions"],
-        "privacy": ["privacy", "data policy"],
-        "faq": ["faq", "help", "common questions"],
-        "tracking": ["track", "tracking", "order status"],
-        "blog": ["blog", "news", "articles"],
-        "partners": ["partners", "partnerships"],
-        "home": ["home", "homepage"]
-    }
-
-    for intent_value, keywords in general_keywords.items():
+    for intent_value, keywords in GENERAL_KEYWORDS.items():
         if any(k in text_lower for k in keywords):
             return intent_value
 
@@ -91,28 +116,26 @@ def detect_intent(text: str) -> str:
 
 
 
-def update_followup_state(current_intent: str) -> bool:
+def update_followup_state(current_intent: str, state: ConversationState = default_state) -> bool:
     """
     Returns True if the user is within the follow-up window (≤3),
     and False if follow-up state should reset.
     """
-    global last_intent, followup_count
-
     if current_intent == "product":
-        if last_intent == "product":
-            if followup_count < MAX_FOLLOWUPS:
-                followup_count += 1
-                print(f"[FOLLOW-UP COUNT] {followup_count}/3")
+        if state.last_intent == "product":
+            if state.followup_count < MAX_FOLLOWUPS:
+                state.followup_count += 1
+                print(f"[FOLLOW-UP COUNT] {state.followup_count}/3")
                 return True
             else:
                 print("[INFO] Max follow-ups reached. Resetting follow-up count.")
-                followup_count = 0
+                state.followup_count = 0
                 return False
         else:
-            followup_count = 0
-            last_intent = "product"
+            state.followup_count = 0
+            state.last_intent = "product"
             return False
     else:
-        followup_count = 0
-        last_intent = current_intent
+        state.followup_count = 0
+        state.last_intent = current_intent
         return False
@@ -0,0 +1,167 @@
+"""
+Portable knowledge-base snapshots, so new nodes never re-scrape or re-embed.
+
+    python kb_snapshot.py export snapshots/kb-2026-10
+    python kb_snapshot.py import snapshots/kb-2026-10
+
+A snapshot directory holds:
+    embeddings.f16.npy   contiguous float16 matrix, one row per chunk
+    records.jsonl        one {"id", "document", "metadata"} per row, same order
+    parents.jsonl        full product records (see db.PARENTS_FILENAME)
+    name_index.npz       product-name/alias embeddings, when the store has one
+    manifest.json        format version, embedding model, shape, sha256 of every file
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+import numpy as np
+from db import PARENTS_FILENAME, load_parents, save_parents
+from local_index import LOCAL_INDEX_MODE, index_path, write_local_index
+from name_index import NAME_INDEX_FILENAME
+from vectorstore_utils import (
+    EMBED_MODEL, VERSIONS_PATH, current_version_path, new_version_path, load_vectorstore,
+    validate_vectorstore, publish_version, gc_versions
+)
+
+FORMAT_VERSION = 1
+EMBEDDINGS_FILE = "embeddings.f16.npy"
+RECORDS_FILE = "records.jsonl"
+MANIFEST_FILE = "manifest.json"
+ADD_BATCH_SIZE = 2000   # below Chroma's max batch size
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_snapshot(out_dir: str, store_path: str | None = None):
+    store_path = store_path or current_version_path()
+    vectorstore = load_vectorstore(store_path)
+    raw = vectorstore._collection.get(include=["embeddings", "documents", "metadatas"])
+    if not raw["ids"]:
+        raise ValueError(f"❌ Vectorstore at `{store_path}` is empty; nothing to export.")
+
+    os.makedirs(out_dir, exist_ok=True)
+    vectors = np.asarray(raw["embeddings"], dtype=np.float16)
+    np.save(os.path.join(out_dir, EMBEDDINGS_FILE), vectors)
+
+    with open(os.path.join(out_dir, RECORDS_FILE), "w", encoding="utf-8") as f:
+        for id_, doc, meta in zip(raw["ids"], raw["documents"], raw["metadatas"]):
+            f.write(json.dumps({"id": id_, "document": doc, "metadata": meta or {}}, ensure_ascii=False) + "\n")
+
+    save_parents(out_dir, load_parents(store_path))
+
+    files = [EMBEDDINGS_FILE, RECORDS_FILE, PARENTS_FILENAME]
+    name_index_file = os.path.join(store_path, NAME_INDEX_FILENAME)
+    if os.path.exists(name_index_file):
+        shutil.copyfile(name_index_file, os.path.join(out_dir, NAME_INDEX_FILENAME))
+        files.append(NAME_INDEX_FILENAME)
+    manifest = {
+        "format": FORMAT_VERSION,
+        "embedding_model": EMBED_MODEL,
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "dtype": "float16",
+        "source_version": os.path.basename(store_path),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "files": {name: file_sha256(os.path.join(out_dir, name)) for name in files}
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✅ Exported {manifest['count']} chunks ({manifest['dim']} dims) to `{out_dir}/`")
+    return manifest
+
+
+def read_manifest(snapshot_dir: str) -> dict:
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"❌ Unsupported snapshot format: {manifest.get('format')}")
+    if manifest.get("embedding_model") != EMBED_MODEL:
+        raise ValueError(
+            f"❌ Snapshot was embedded with {manifest.get('embedding_model')}, this node uses {EMBED_MODEL}."
+        )
+    for name, expected in manifest["files"].items():
+        if file_sha256(os.path.join(snapshot_dir, name)) != expected:
+            raise ValueError(f"❌ Snapshot file `{name}` does not match its manifest hash.")
+    return manifest
+
+
+def import_snapshot(snapshot_dir: str):
+    """Loads a snapshot into a new vectorstore version and publishes it; no API calls are made."""
+    manifest = read_manifest(snapshot_dir)
+    vectors = np.load(os.path.join(snapshot_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    if vectors.shape != (manifest["count"], manifest["dim"]):
+        raise ValueError(f"❌ Embedding matrix shape {vectors.shape} does not match the manifest.")
+
+    ids, documents, metadatas = [], [], []
+    with open(os.path.join(snapshot_dir, RECORDS_FILE), encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            ids.append(record["id"])
+            documents.append(record["document"])
+            metadatas.append(record["metadata"])
+
+    target_path = new_version_path()
+    os.makedirs(VERSIONS_PATH, exist_ok=True)
+    try:
+        vectorstore = load_vectorstore(target_path)
+        for start in range(0, len(ids), ADD_BATCH_SIZE):
+            end = start + ADD_BATCH_SIZE
+            vectorstore._collection.add(
+                ids=ids[start:end],
+                embeddings=vectors[start:end].astype(np.float32).tolist(),
+                documents=documents[start:end],
+                metadatas=metadatas[start:end]
+            )
+        vectorstore.persist()
+        # Older snapshots hold parents.json; either way the store gets the current format
+        save_parents(target_path, load_parents(snapshot_dir))
+        if NAME_INDEX_FILENAME in manifest["files"]:
+            shutil.copyfile(
+                os.path.join(snapshot_dir, NAME_INDEX_FILENAME), os.path.join(target_path, NAME_INDEX_FILENAME)
+            )
+
+        # The snapshot matrix already is a float16 local index; write it without re-reading Chroma
+        if LOCAL_INDEX_MODE != "off":
+            write_local_index(index_path(target_path), ids, vectors, documents, metadatas, LOCAL_INDEX_MODE)
+
+        if not validate_vectorstore(vectorstore):
+            raise RuntimeError("Imported vectorstore failed validation; not publishing.")
+    except Exception:
+        shutil.rmtree(target_path, ignore_errors=True)
+        raise
+
+    publish_version(target_path)
+    gc_versions()
+    print(f"✅ Imported {len(ids)} chunks from `{snapshot_dir}/` into `{target_path}/`")
+    return target_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import a knowledge-base snapshot.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_cmd = sub.add_parser("export", help="write the published vectorstore to a snapshot directory")
+    export_cmd.add_argument("out_dir")
+    export_cmd.add_argument("--store", help="vectorstore directory to export (default: published version)")
+    import_cmd = sub.add_parser("import", help="load a snapshot directory and publish it")
+    import_cmd.add_argument("snapshot_dir")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_snapshot(args.out_dir, args.store)
+    else:
+        import_snapshot(args.snapshot_dir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
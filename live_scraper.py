@@ -1,4 +1,4 @@
-import requests
+import http_cache
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import hashlib
@@ -25,7 +25,7 @@ def crawl_product_pages():
         for page in range(1, 10):
             url = f"{BASE_URL}/shop?Category={encoded}&page={page}"
             try:
-                response = requests.get(url, headers=headers, timeout=10)
+                response = http_cache.fetch(url, headers=headers, timeout=10)
                 soup = BeautifulSoup(response.text, "html.parser")
 
                 links = {
@@ -54,7 +54,7 @@ def compute_hash(text: str) -> str:
 
 def scrape_product_page(url: str, category: str = "Uncategorized") -> dict:
     try:
-        res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+        res = http_cache.fetch(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
         soup = BeautifulSoup(res.text, "html.parser")
 
         # Title
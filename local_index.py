@@ -0,0 +1,167 @@
+import os
+import json
+import shutil
+import numpy as np
+from langchain_core.documents import Document
+
+# Optional local copy of the Chroma collection, served straight from memory-mapped arrays.
+# Chroma stays the system of record; this is rebuilt from it for every published version.
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX", "off").lower()   # off | float16 | int8
+INDEX_DIRNAME = "local_index"
+RESCORE_FACTOR = 4                                          # int8 shortlist size = k * factor
+SCORE_BLOCK_ROWS = 4096                                     # rows cast to float32 at a time
+FORMAT_VERSION = 1
+
+
+def index_path(store_path: str) -> str:
+    return os.path.join(store_path, INDEX_DIRNAME)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def write_local_index(path: str, ids, embeddings, documents, metadatas, mode: str = "float16"):
+    """Writes normalized vectors (and int8 codes when requested) plus records to `path` atomically."""
+    if mode not in ("float16", "int8"):
+        raise ValueError(f"Unsupported local index mode: {mode}")
+
+    vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    # float16 rows are always kept: scanned directly in float16 mode, used for rescoring in int8 mode
+    np.save(os.path.join(tmp_path, "vectors.f16.npy"), vectors.astype(np.float16))
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        np.save(os.path.join(tmp_path, "codes.i8.npy"), codes)
+        np.save(os.path.join(tmp_path, "scales.f32.npy"), scales.astype(np.float32))
+
+    with open(os.path.join(tmp_path, "records.json"), "w", encoding="utf-8") as f:
+        json.dump({"ids": list(ids), "documents": list(documents), "metadatas": list(metadatas)}, f, ensure_ascii=False)
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "mode": mode,
+            "count": int(vectors.shape[0]),
+            "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0
+        }, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def export_local_index(vectorstore, store_path: str, mode: str = LOCAL_INDEX_MODE):
+    raw = vectorstore._collection.get(include=["embeddings", "documents", "metadatas"])
+    if not raw["ids"]:
+        print("[WARN] Not exporting local index: collection is empty.")
+        return
+    write_local_index(
+        index_path(store_path), raw["ids"], raw["embeddings"], raw["documents"], raw["metadatas"], mode
+    )
+    print(f"[INFO] Exported {len(raw['ids'])} vectors to {mode} local index in `{store_path}`")
+
+
+def _blockwise_scores(matrix: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """matrix @ q with only SCORE_BLOCK_ROWS rows converted to float32 at once, not the whole index."""
+    scores = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+        block = matrix[start:start + SCORE_BLOCK_ROWS]
+        np.matmul(block.astype(np.float32), q, out=scores[start:start + len(block)])
+    return scores
+
+
+class LocalIndex:
+    """Top-k cosine search over memory-mapped vectors; pages are shared across processes."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported local index format: {meta.get('format')}")
+        self.mode = meta["mode"]
+        self.vectors = np.load(os.path.join(path, "vectors.f16.npy"), mmap_mode="r")
+        self.codes = self.scales = None
+        if self.mode == "int8":
+            self.codes = np.load(os.path.join(path, "codes.i8.npy"), mmap_mode="r")
+            self.scales = np.load(os.path.join(path, "scales.f32.npy"))
+
+        with open(os.path.join(path, "records.json"), encoding="utf-8") as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+        self._masks: dict[tuple, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _mask(self, filter: dict | None):
+        if not filter:
+            return None
+        key = tuple(sorted(filter.items()))
+        if key not in self._masks:
+            self._masks[key] = np.array(
+                [all(m.get(k) == v for k, v in filter.items()) for m in self.metadatas], dtype=bool
+            )
+        return self._masks[key]
+
+    def _scores(self, q: np.ndarray, rows=None) -> np.ndarray:
+        if rows is not None:
+            return self.vectors[rows].astype(np.float32) @ q
+        return _blockwise_scores(self.vectors, q)
+
+    def search(self, query_vector, k: int = 4, filter: dict | None = None) -> list[tuple[int, float]]:
+        """Returns (row, cosine score) pairs, best first."""
+        if not self.ids:
+            return []
+        q = np.asarray(query_vector, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+
+        if self.mode == "int8":
+            approx = _blockwise_scores(self.codes, q) * self.scales
+        else:
+            approx = self._scores(q)
+
+        mask = self._mask(filter)
+        if mask is not None:
+            approx = np.where(mask, approx, -np.inf)
+
+        shortlist_size = k * RESCORE_FACTOR if self.mode == "int8" else k
+        shortlist_size = min(shortlist_size, len(approx))
+        shortlist = np.argpartition(-approx, shortlist_size - 1)[:shortlist_size]
+        shortlist = shortlist[np.isfinite(approx[shortlist])]
+
+        # int8 candidates are rescored against their float16 rows; only those pages are touched
+        scores = self._scores(q, shortlist) if self.mode == "int8" else approx[shortlist]
+        order = np.argsort(-scores)[:k]
+        return [(int(shortlist[i]), float(scores[i])) for i in order]
+
+    def vectors_for(self, rows: list[int]) -> np.ndarray:
+        """float32 copies of the given rows (only their pages are read)."""
+        return self.vectors[np.asarray(rows, dtype=np.int64)].astype(np.float32)
+
+    def document(self, row: int) -> Document:
+        return Document(page_content=self.documents[row], metadata=self.metadatas[row] or {})
+
+    def similarity_search_by_vector(self, query_vector, k: int = 4, filter: dict | None = None) -> list[Document]:
+        return [self.document(row) for row, _ in self.search(query_vector, k, filter)]
+
+
+def load_local_index(store_path: str, vectorstore=None):
+    """Opens the version's local index, exporting it from Chroma first if it is enabled but missing."""
+    if LOCAL_INDEX_MODE == "off":
+        return None
+    path = index_path(store_path)
+    try:
+        if not os.path.exists(os.path.join(path, "meta.json")) and vectorstore is not None:
+            export_local_index(vectorstore, store_path)
+        return LocalIndex(path)
+    except Exception as e:
+        print("[WARN] Local index unavailable, using Chroma search:", e)
+        return None
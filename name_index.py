@@ -0,0 +1,142 @@
+import os
+import re
+import numpy as np
+from fuzzywuzzy import fuzz
+from facet_index import FACET_TERMS
+
+# Small embedding index of product names and aliases, built per vectorstore version,
+# so a query resolves to a product before any description retrieval.
+NAME_INDEX_FILENAME = "name_index.npz"
+NAME_MIN_SCORE = float(os.getenv("NAME_MIN_SCORE", "0.45"))
+NAME_MIN_FUZZY = int(os.getenv("NAME_MIN_FUZZY", "88"))
+NAME_CANDIDATES = 5
+BRAND_PREFIX = re.compile(r"^\s*silvestre\s+", re.IGNORECASE)
+# Type and grade-system words many products share; a match needs some other word of the name
+GENERIC_WORDS = FACET_TERMS | {"oil", "lubricant", "lube", "fluid", "silvestre", "sae", "iso", "vg", "nlgi"}
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.lower())).strip()
+
+
+def name_words(text: str) -> set[str]:
+    words = normalize(text).split()
+    return {w[:-1] if w.endswith("s") and w[:-1] in GENERIC_WORDS else w for w in words}
+
+
+def product_aliases(record: dict) -> list[str]:
+    """The product name plus the URL slug and the name without the brand, when they differ."""
+    name = record.get("name", "").strip()
+    aliases = [name] if name else []
+    slug = record.get("url", "").rstrip("/").rsplit("/product-page/", 1)
+    if len(slug) == 2:
+        aliases.append(slug[1].replace("-", " ").replace("%20", " "))
+    unbranded = BRAND_PREFIX.sub("", name)
+    if unbranded and unbranded != name:
+        aliases.append(unbranded)
+
+    unique, seen = [], set()
+    for alias in aliases:
+        key = normalize(alias)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(alias)
+    return unique
+
+
+def _embed_names(embeddings, texts: list[str]) -> list[list[float]]:
+    # Names and questions are both short texts, so embed names as queries too
+    embed = getattr(embeddings, "embed", None)
+    if embed is not None:
+        return embed(texts, input_type="search_query")
+    return embeddings.embed_documents(texts)
+
+
+def build_name_index(store_path: str, parents: dict[str, dict], embeddings, previous_path: str | None = None):
+    """Embeds every alias once; aliases already in `previous_path`'s index reuse their vectors."""
+    aliases, parent_ids = [], []
+    for parent_id, record in parents.items():
+        for alias in product_aliases(record):
+            aliases.append(alias)
+            parent_ids.append(parent_id)
+    if not aliases:
+        return None
+
+    known = {}
+    previous = load_name_index(previous_path) if previous_path else None
+    if previous is not None:
+        known = dict(zip(previous.aliases, previous.vectors))
+
+    missing = list(dict.fromkeys(a for a in aliases if a not in known))
+    if missing:
+        print(f"[INFO] Embedding {len(missing)} product names/aliases for the name index...")
+        for alias, vector in zip(missing, _embed_names(embeddings, missing)):
+            known[alias] = np.asarray(vector, dtype=np.float32)
+
+    vectors = np.stack([np.asarray(known[a], dtype=np.float32) for a in aliases])
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    path = os.path.join(store_path, NAME_INDEX_FILENAME)
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, vectors=vectors, aliases=np.array(aliases), parent_ids=np.array(parent_ids))
+    os.replace(tmp, path)
+    print(f"[INFO] Name index: {len(aliases)} aliases for {len(parents)} products")
+    return NameIndex(vectors, aliases, parent_ids)
+
+
+class NameIndex:
+    def __init__(self, vectors: np.ndarray, aliases: list[str], parent_ids: list[str]):
+        self.vectors = vectors
+        self.aliases = list(aliases)
+        self.parent_ids = list(parent_ids)
+        self.normalized = [normalize(a) for a in self.aliases]
+        self.distinct = [name_words(a) - GENERIC_WORDS for a in self.aliases]
+
+    def _names_product(self, query_norm: str, query_words: set[str], row: int) -> bool:
+        # "do you have gear oil" shares only type words with "Gear Oil 90"; an alias made of
+        # type words alone ("Gear & Chain Oil") must appear in the question as a whole phrase
+        if self.distinct[row]:
+            return bool(query_words & self.distinct[row])
+        return f" {self.normalized[row]} " in f" {query_norm} "
+
+    def resolve(self, query: str, query_vector) -> tuple[str, float] | None:
+        """
+        One matrix product ranks every alias; the few best candidates are confirmed with a fuzzy
+        name check, and must share a word that sets the product apart (not just "gear oil"),
+        so a generic question doesn't snap to an arbitrary product.
+        Returns (parent_id, fuzzy score) or None.
+        """
+        found = self.match(query, query_vector)
+        return found[:2] if found else None
+
+    def match(self, query: str, query_vector) -> tuple[str, float, str] | None:
+        """Like resolve(), plus the alias that matched."""
+        q = np.asarray(query_vector, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        scores = self.vectors @ q
+        top = np.argsort(-scores)[:NAME_CANDIDATES]
+
+        query_norm = normalize(query)
+        query_words = name_words(query)
+        best = None
+        for row in top:
+            if scores[row] < NAME_MIN_SCORE:
+                break
+            fuzzy = fuzz.token_set_ratio(query_norm, self.normalized[row])
+            print(f"[NAME INDEX] {scores[row]:.2f} / fuzzy {fuzzy} for '{self.aliases[row]}'")
+            if fuzzy < NAME_MIN_FUZZY or not self._names_product(query_norm, query_words, row):
+                continue
+            if best is None or fuzzy > best[1]:
+                best = (self.parent_ids[row], fuzzy, self.aliases[row])
+        return best
+
+
+def load_name_index(store_path: str) -> NameIndex | None:
+    path = os.path.join(store_path, NAME_INDEX_FILENAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        data = np.load(path, allow_pickle=False)
+        return NameIndex(data["vectors"], [str(a) for a in data["aliases"]], [str(p) for p in data["parent_ids"]])
+    except Exception as e:
+        print("[WARN] Ignoring unreadable name index:", e)
+        return None
@@ -0,0 +1,39 @@
+import re
+
+# Compound questions ("compare X and Y prices", "how much are X and Y?") are split on their
+# connectives. The split is only a candidate: rag_chain.aanswer_compound keeps it when at least
+# two parts confidently name products, so "grease for bearings and gears" stays one question.
+MAX_PARTS = 4
+MIN_PART_CHARS = 3
+
+LEAD_IN = re.compile(
+    r"^\s*(?:(?:can|could) you\s+)?(?:please\s+)?(?:"
+    r"compare|what(?:'s| is| are) the differences? between|differences? between|"
+    r"what(?:'s| is| are) the (?:prices?|costs?) (?:of|for)|how much (?:is|are|for)|"
+    r"do you (?:have|sell|carry|offer)|(?:prices?|costs?) (?:of|for)|magkano (?:ang|yung)"
+    r")\s+",
+    re.IGNORECASE
+)
+TRAILING = re.compile(r"(?:\s*\b(?:prices?|pricing|costs?|please)\b|\s*[?.!])+\s*$", re.IGNORECASE)
+# Commas inside numbers ("₱2,000") don't separate anything
+SEPARATOR = re.compile(r"\s*(?:,(?!\d)|;|&|\+|\band\b|\bor\b|\bvs\.?|\bversus\b)\s*", re.IGNORECASE)
+
+
+def split_compound_query(query: str) -> list[str]:
+    """Product mentions in a compound question, or [query] when it mentions one thing."""
+    text = TRAILING.sub("", LEAD_IN.sub("", query.strip()))
+    parts = [p.strip(" ?.!") for p in SEPARATOR.split(text)]
+    parts = [p for p in parts if len(p) >= MIN_PART_CHARS]
+    if not 2 <= len(parts) <= MAX_PARTS:
+        return [query]
+    return parts
+
+
+def names_whole_query(alias: str, query: str) -> bool:
+    """
+    True when a product name matched against the whole question itself contains a connective
+    the split would cut ("Gear & Chain Oil"), so the question is about that one product.
+    """
+    if not SEPARATOR.search(alias):
+        return False
+    return " ".join(alias.lower().split()) in " ".join(query.lower().split())
@@ -1,21 +1,29 @@
 import os
 import re
-import time
 import random
+import asyncio
+import threading
+from concurrent.futures import Future
 from collections import defaultdict
 from dotenv import load_dotenv
-from typing import Optional
 from langchain_core.documents import Document
 from fuzzywuzzy import fuzz
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_groq import ChatGroq
-from langchain_cohere import CohereEmbeddings
-from langchain_community.vectorstores import Chroma
-from vectorstore_utils import load_vectorstore
+from vectorstore_utils import live_store, make_embeddings, EMBED_MODEL
+from api_scheduler import get_scheduler
+from embed_batcher import MicroBatchEmbeddings
+from request_profiler import profile_request, offload
 from intent_utils import detect_intent, is_followup_question
-from db import get_all_product_names, GENERAL_PAGES
-from intent_utils import is_followup_question, update_followup_state
+from db import get_all_product_names, product_parent_id, GENERAL_PAGES
+from intent_utils import is_followup_question, update_followup_state, ConversationState, default_state
+from intent_utils import LIST_PRODUCTS_KEYWORDS, ABOUT_PAGE_KEYWORDS, CONTACT_PAGE_KEYWORDS
+from intent_classifier import IntentClassifier
+from structured_answers import answer_structured
+from facet_index import parse_filter_query, describe_filters, MAX_FILTER_RESULTS
+from query_decomposition import split_compound_query, names_whole_query
+from rerank_utils import RERANK_FETCH_K, mmr_rerank
 from langchain_core.runnables import (
     RunnableParallel,
     RunnablePassthrough,
@@ -27,26 +35,21 @@ load_dotenv()
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "llama3-70b-8192"
-CHROMA_PATH = "chroma_db"
 
-# Globals
-last_product_doc: Optional[Document] = None
-
-# Embedding + Vectorstore
-embedding = CohereEmbeddings(
-    model="embed-multilingual-v3.0", cohere_api_key=COHERE_API_KEY
-)
-vectorstore = load_vectorstore()
-
-vectorstore = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding)
-retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
+# Embedding (the vectorstore itself is served through `live_store`)
+# Concurrent query embeddings are coalesced into batched requests
+embedding = MicroBatchEmbeddings(make_embeddings())
+intent_classifier = IntentClassifier(embedding, EMBED_MODEL)
 
 # LLM
-llm = ChatGroq(
-    groq_api_key=GROQ_API_KEY,
-    model=GROQ_MODEL,
-    temperature=0.2
-)
+def make_llm():
+    return ChatGroq(
+        groq_api_key=GROQ_API_KEY,
+        model=GROQ_MODEL,
+        temperature=0.2
+    )
+
+llm = make_llm()
 
 # PROMPTS
 PRODUCT_PROMPT = PromptTemplate.from_template("""
@@ -106,30 +109,35 @@ Respond concisely and specifically to the follow-up question (e.g., just pricing
   
 
 # RAG CHAINS
-rag_chain_product = (
-    RunnableParallel(
-        context=RunnableLambda(lambda x: x["context"]),
-        question=RunnablePassthrough(),
-        history=RunnableLambda(lambda x: x.get("history", ""))
-    ) | PRODUCT_PROMPT | llm | StrOutputParser()
-)
-
-rag_chain_general = (
-    RunnableParallel(
-        context=RunnableLambda(lambda x: x["context"]),
-        question=RunnablePassthrough(),
-        history=RunnableLambda(lambda x: x.get("history", ""))
-    ) | GENERAL_PROMPT | llm | StrOutputParser()
-)
-
-rag_chain_followup = (
-    RunnableParallel(
-        context=RunnableLambda(lambda x: x["context"]),
-        question=RunnablePassthrough(),
-        history=RunnableLambda(lambda x: x.get("history", ""))
-    ) | FOLLOWUP_PROMPT | llm | StrOutputParser()
-)
-
+def make_chain(prompt: PromptTemplate):
+    return (
+        RunnableParallel(
+            context=RunnableLambda(lambda x: x["context"]),
+            question=RunnablePassthrough(),
+            history=RunnableLambda(lambda x: x.get("history", ""))
+        ) | prompt | llm | StrOutputParser()
+    )
+
+rag_chain_product = make_chain(PRODUCT_PROMPT)
+rag_chain_general = make_chain(GENERAL_PROMPT)
+rag_chain_followup = make_chain(FOLLOWUP_PROMPT)
+
+def after_fork():
+    """
+    Called in a forked worker: fresh Cohere and Groq clients, so no worker reuses a pooled
+    connection the parent opened (e.g. embedding intent centroids in warm_up).
+    """
+    global llm, rag_chain_product, rag_chain_general, rag_chain_followup
+    embedding.inner = make_embeddings()
+    llm = make_llm()
+    rag_chain_product = make_chain(PRODUCT_PROMPT)
+    rag_chain_general = make_chain(GENERAL_PROMPT)
+    rag_chain_followup = make_chain(FOLLOWUP_PROMPT)
+
+
+async def ainvoke_chain(chain, inputs: dict) -> str:
+    """Runs an LLM chain through the shared Groq scheduler (interactive priority by default)."""
+    return await get_scheduler("groq").arun(chain.ainvoke, inputs)
 
 
 # MAIN BOT LOGIC
@@ -141,87 +149,359 @@ def clean_price_fallback_lines(response: str, price: str) -> str:
     if price.lower() in ["contact us for pricing", "n/a", "not available"]:
         return response 
 
-def ask_bot(query: str, history: list[dict]) -> str:
-    global last_product_doc
+async def aembed_query_safely(query: str):
+    """Embeds the query once; the vector is shared by intent routing and retrieval."""
+    try:
+        return await embedding.aembed_query(query)
+    except Exception as e:
+        print("[WARN] Query embedding failed, falling back to keyword routing:", e)
+        return None
+
+def keyword_intent(query: str, state: ConversationState) -> str:
+    query_lower = query.lower()
+    if any(k in query_lower for k in LIST_PRODUCTS_KEYWORDS):
+        return "list_products"
+    if is_followup_question(query) and state.last_product_doc:
+        return "followup"
+    intent = detect_intent(query)
+    if intent != "product":
+        if any(k in query_lower for k in ABOUT_PAGE_KEYWORDS):
+            return "about"
+        if any(k in query_lower for k in CONTACT_PAGE_KEYWORDS):
+            return "contact"
+    return intent
+
+def route_query(query: str, query_vector, state: ConversationState) -> str:
+    """Embedding-centroid intent, with the keyword rules as fallback when unsure."""
+    if query_vector is not None:
+        try:
+            label, score = intent_classifier.classify(query_vector)
+            print(f"[INTENT] {label or 'uncertain'} (score: {score:.2f})")
+            if label == "followup" and not state.last_product_doc:
+                label = None
+            if label:
+                return label
+        except Exception as e:
+            print("[WARN] Intent classifier failed:", e)
+    return keyword_intent(query, state)
+
+async def aretrieve(query: str, query_vector, snap, k: int = 4) -> list[Document]:
+    if query_vector is not None and RERANK_FETCH_K > k:
+        # Over-fetch with embeddings, then keep k diverse chunks (MMR + per-source cap)
+        if snap.index is not None:
+            docs, vectors = snap.search_with_vectors(query_vector, RERANK_FETCH_K)
+        else:
+            docs, vectors = await offload(snap.search_with_vectors, query_vector, RERANK_FETCH_K)
+        return mmr_rerank(query_vector, docs, vectors, k)
+    if query_vector is not None:
+        if snap.index is not None:
+            # In-process mmap search; sub-millisecond, no need to leave the loop
+            return snap.similarity_search_by_vector(query_vector, k=k)
+        return await offload(snap.vectorstore.similarity_search_by_vector, query_vector, k=k)
+    return await offload(snap.retriever.invoke, query)
+
+async def arun_product_chain(query: str, context: str, formatted_history: str, is_followup: bool, price: str) -> str:
+    """LLM answer for a product question, with retries and price-fallback cleanup; "" on failure."""
+    # Retry mechanism
+    response = ""
+    for attempt in range(3):
+        try:
+            chain = rag_chain_followup if is_followup else rag_chain_product
+            response = await ainvoke_chain(chain, {
+                "question": query,
+                "context": context,
+                "history": formatted_history
+            })
+            if response:
+                response = response.strip()
+            break
+        except Exception as e:
+            print(f"[RETRY {attempt + 1}] Product query failed:", e)
+            await asyncio.sleep(1)
+
+    if not response:
+        return ""
+
+    # Clean price fallback if real price is available
+    if price != "Contact us for pricing":
+        patterns = [
+            r"(?i)as for pricing.*?\.",
+            r"(?i)price\s*[:\-–]?\s*(not available|n/a|unknown).*?(\n|$)",
+            r"(?i)unfortunately.*?(price|pricing).*?\.",
+            r"(?i)pricing.*?not.*?(available|provided).*?\.",
+            r"(?i)i don’t have.*?(price|pricing).*?\."
+        ]
+        for p in patterns:
+            response = re.sub(p, "", response).strip()
+    return response
+
+def product_context(doc: Document) -> str:
+    return f"""Product Name: {doc.metadata.get("name", "this product")}
+Category: {doc.metadata.get("category", "Uncategorized")}
+Availability: Available in Pails and Drums
+URL: {doc.metadata.get("url", "")}
+
+Description:
+{doc.page_content}
+"""
+
+async def afacet_search(snap, filters: dict) -> list[dict]:
+    # The first use builds the snapshot's facet index (reading Chroma on older stores)
+    def facet_search():
+        return snap.facets.search(filters)
+    return await offload(facet_search)
+
+async def aresolve_product(query: str, query_vector, snap, fallback: bool = True):
+    """
+    Resolves a product mention: a Document for one product, a list of product records when
+    the text is a filter matching several products, or None. Without `fallback` only confident
+    matches count (name index, strong retrieval, explicit filters); no fuzzy catalog scan.
+    """
+    # Step 0: Dedicated product-name index (names and aliases only, no descriptions)
+    if query_vector is not None and snap.names is not None:
+        hit = snap.names.resolve(query, query_vector)
+        if hit:
+            matched = snap.parent_document(hit[0])
+            if matched:
+                print(f"[NAME MATCH] Matched: {matched.metadata.get('name')} (Score: {hit[1]})")
+                return matched
+
+    # Step 0b: Filter questions ("SAE 40 oils under ₱2,000", "do you have marine grease") are set/range lookups
+    filters = parse_filter_query(query)
+    if filters:
+        found = await afacet_match(query, filters, snap)
+        if found is not None:
+            return found
+
+    # Step 1: Retriever-based match
+    docs = await aretrieve(query, query_vector, snap)
+    best_doc = None
+    best_score = 0
+
+    for d in docs:
+        if d.metadata.get("type") != "product":
+            continue
+        name = d.metadata.get("name", "").lower()
+        score = fuzz.token_set_ratio(query.lower(), name)
+        print(f"[RETRIEVER SEMANTIC SCORE] {score:.2f} for '{name}'")
+        if score > best_score:
+            best_doc = d
+            best_score = score
+
+    if best_doc and best_score >= 88:
+        matched = snap.resolve_parent(best_doc)
+        print(f"[RETRIEVER MATCH] Matched: {matched.metadata.get('name')} (Score: {best_score})")
+        return matched
+    if not fallback:
+        return None
+
+    # Step 2: Fuzzy fallback
+    print("[INFO] No strong vector match. Trying fuzzy fallback.")
+    # A Chroma read on stores without a parents file; keep it off the loop
+    product_meta = await offload(snap.product_records)
+
+    def normalize(text): return re.sub(r"[^\w\s]", "", text.lower())
+
+    best_match = None
+    highest_score = 0
+
+    for meta in product_meta:
+        name = meta.get("name", "")
+        if not name:
+            continue
+        score = fuzz.token_set_ratio(normalize(query), normalize(name))
+        print(f"[DEBUG] Fuzzy score: {score:.2f} | '{name}'")
+        if score > highest_score:
+            best_match = meta
+            highest_score = score
+
+    if best_match and highest_score >= 80:
+        print(f"[MATCH FOUND] Accepting fuzzy match: {best_match['name']} (Score: {highest_score})")
+        return snap.resolve_parent(Document(page_content="No description available.", metadata=best_match))
+    print(f"[NO MATCH] Best fuzzy score: {highest_score}")
+
+    # Step 3: No product named; bare type words ("gear oil") still narrow the catalog
+    filters = parse_filter_query(query, loose=True)
+    if filters and not filters.keys() - {"terms"}:
+        return await afacet_match(query, filters, snap)
+    return None
+
+async def afacet_match(query: str, filters: dict, snap):
+    """Several facet hits as a list of records, a single hit as its Document, or None."""
+    products = await afacet_search(snap, filters)
+    print(f"[FACETS] {describe_filters(filters)} -> {len(products)} products")
+    if len(products) > 1:
+        return products
+    if products:
+        return snap.resolve_parent(Document(page_content="No description available.", metadata=products[0]))
+    return None
+
+async def aanswer_compound(query: str, query_vector, parts: list[str], snap, formatted_history: str,
+                           state: ConversationState) -> str | None:
+    """
+    Resolves every part of a compound question concurrently and answers with one LLM call.
+    Returns None when fewer than two parts resolve confidently, or the whole question names one
+    product whose name the split cut ("Gear & Chain Oil"), so the caller treats it as one question.
+    """
+    # Part embeddings arrive together and share one batched request
+    vectors = await asyncio.gather(*(aembed_query_safely(part) for part in parts))
+    # Bare type words ("gears") don't resolve a part, so "a grease for bearings and gears" stays whole
+    resolved = await asyncio.gather(*(aresolve_product(p, v, snap, fallback=False)
+                                      for p, v in zip(parts, vectors)))
+
+    products, listings, seen = [], [], set()
+    for part, result in zip(parts, resolved):
+        if isinstance(result, list):
+            listings.append((part, result))
+        elif result is not None:
+            key = result.metadata.get("parent_id") or result.metadata.get("url") or result.metadata.get("name")
+            if key not in seen:
+                seen.add(key)
+                products.append(result)
+    if len(products) + len(listings) < 2:
+        return None
+    # The whole question also matches any one full name it contains, so only a name spanning
+    # the connective itself means the split was wrong
+    if query_vector is not None and snap.names is not None:
+        whole = snap.names.match(query, query_vector)
+        if whole and names_whole_query(whole[2], query):
+            print(f"[COMPOUND] Kept whole: '{whole[2]}' names the full question")
+            return None
+    print(f"[COMPOUND] {len(parts)} parts -> {len(products)} products, {len(listings)} listings")
+    # A follow-up after a multi-product answer has no single product to refer to
+    state.last_product_doc = None
+
+    footer = ""
+    for doc in products:
+        footer += f"\n\n{doc.metadata.get('name', 'Product')}: {doc.metadata.get('price', 'Contact us for pricing')}"
+        if doc.metadata.get("url"):
+            footer += f"\nProduct Page: {doc.metadata['url']}"
+
+    # Fast path: "how much are X and Y?" is answered from metadata alone
+    names = [doc.metadata.get("name", "") for doc in products]
+    structured = [answer_structured(query, doc, names) for doc in products]
+    if not listings and all(structured):
+        print("[FAST PATH] Answered compound question from product metadata")
+        return "\n\n".join(structured) + footer
+
+    blocks = [product_context(doc) for doc in products]
+    for part, records in listings:
+        lines = [f"Products matching \"{part}\":"]
+        lines += [f"- {r.get('name', 'Unnamed Product')} — {r.get('price', 'Contact us for pricing')}"
+                  for r in records[:MAX_FILTER_RESULTS]]
+        blocks.append("\n".join(lines))
+    context = "\n\n---\n\n".join(blocks)
+
+    # Several products may mix real and missing prices, so skip the single-price cleanup
+    response = await arun_product_chain(query, context, formatted_history, False, "Contact us for pricing")
+    if not response:
+        return "Sorry, I couldn’t process your product question right now. Please try again later."
+    return response + footer
+
+# One event loop per process runs every conversation. Async API clients bind to the loop
+# that first uses them, so threaded callers submit here instead of starting their own loops.
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+def bot_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid
+    # Started lazily, and again in forked children (threads don't survive fork)
+    if _loop_pid != os.getpid():
+        with _loop_lock:
+            if _loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="bot-loop", daemon=True).start()
+                _loop, _loop_pid = loop, os.getpid()
+    return _loop
+
+def submit_ask(query: str, history: list[dict], state: ConversationState = default_state,
+               profile: bool | None = None) -> Future:
+    """Schedules aask_bot on the shared loop; cancel() on the returned future abandons the request."""
+    return asyncio.run_coroutine_threadsafe(aask_bot(query, history, state, profile), bot_loop())
+
+def ask_bot(query: str, history: list[dict], state: ConversationState = default_state,
+            profile: bool | None = None) -> str:
+    """Blocking wrapper for threaded callers (HTTP workers, scripts)."""
+    return submit_ask(query, history, state, profile).result()
+
+async def aask_bot(query: str, history: list[dict], state: ConversationState = default_state,
+                   profile: bool | None = None) -> str:
+    """
+    Answers one message without blocking the event loop: embedding, retrieval and LLM calls are
+    awaited, so one loop serves many conversations. Cancelling the task abandons its queued or
+    in-flight API calls. Drive it from a single loop per process (see bot_loop). Blocking work
+    goes through offload() so a profiled request also samples the threads doing it.
+    """
+    # Pin one vectorstore version for the whole request so a refresh can swap underneath safely
+    if not live_store.is_loaded():
+        # The first snapshot load opens Chroma and reads indexes from disk
+        await offload(live_store.ensure_loaded)
+    with profile_request(query, profile), live_store.acquire() as snap:
+        return await _aask_bot(query, history, snap, state)
+
+async def _aask_bot(query: str, history: list[dict], snap, state: ConversationState) -> str:
+    vectorstore = snap.vectorstore
     matched = None
-    matched_from_semantic = False
 
-    intent = detect_intent(query)
-    if is_followup_question(query) and last_product_doc:
+    query_vector = await aembed_query_safely(query)
+    if query_vector is not None and intent_classifier.centroids is None:
+        # The one-time centroid load makes blocking API calls; keep it off the loop
+        try:
+            await offload(intent_classifier.ensure_loaded)
+        except Exception as e:
+            print("[WARN] Intent centroids not loaded:", e)
+    # Keyword routing reads product names from SQLite
+    intent = await offload(route_query, query, query_vector, state)
+    routed_followup = intent == "followup"
+    if routed_followup:
         intent = "product"
-        
+
     formatted_history = "\n".join(f"{msg['role'].capitalize()}: {msg['content']}" for msg in history[-3:])
 
     # Reset memory if switching away from product
-    if intent != "product" and last_product_doc:
+    if intent != "product" and state.last_product_doc:
         print("[INFO] Switching away from product intent. Resetting memory.")
-        last_product_doc = None
-
-    # Shortcut: List products
-    if any(keyword in query.lower() for keyword in [
-        "what are your products", "list your products",
-        "show me your products", "can i see your products",
-        "what products do you have"]):
-        return get_all_products()
+        state.last_product_doc = None
+
+    # Shortcut: List products (narrowed by category/grade/price when the question has filters)
+    if intent == "list_products":
+        parts = split_compound_query(query)
+        if len(parts) > 1:
+            response = await aanswer_compound(query, query_vector, parts, snap, formatted_history, state)
+            if response:
+                return response
+        filters = parse_filter_query(query, loose=True)
+        if filters:
+            products = await afacet_search(snap, filters)
+            if products:
+                return format_filtered_products(products, filters)
+        return await offload(get_all_products)
 
     # --------------------- PRODUCT INTENT ---------------------
     if intent == "product":
-        is_followup = is_followup_question(query) or update_followup_state(intent)
+        is_followup = routed_followup or update_followup_state(intent, state)
         if is_followup:
-            if not last_product_doc:
+            if not state.last_product_doc:
                 return "Please mention a specific product so I can assist you better."
-            matched = last_product_doc
+            matched = state.last_product_doc
             print(f"[FOLLOW-UP] Reusing last product: {matched.metadata.get('name')}")
         else:
-            # Step 1: Retriever-based match
-            docs = retriever.get_relevant_documents(query)
-            best_doc = None
-            best_score = 0
-
-            for d in docs:
-                if d.metadata.get("type") != "product":
-                    continue
-                name = d.metadata.get("name", "").lower()
-                score = fuzz.token_set_ratio(query.lower(), name)
-                print(f"[RETRIEVER SEMANTIC SCORE] {score:.2f} for '{name}'")
-                if score > best_score:
-                    best_doc = d
-                    best_score = score
-
-            if best_doc and best_score >= 88:
-                matched = best_doc
-                matched_from_semantic = True
-                print(f"[RETRIEVER MATCH] Matched: {matched.metadata.get('name')} (Score: {best_score})")
-
-            # Step 2: Fuzzy fallback
-            if not matched:
-                print("[INFO] No strong vector match. Trying fuzzy fallback.")
-                all_meta = vectorstore._collection.get(include=["metadatas"])["metadatas"]
-                product_meta = [m for m in all_meta if m.get("type") == "product"]
-
-                def normalize(text): return re.sub(r"[^\w\s]", "", text.lower())
-
-                best_match = None
-                highest_score = 0
-
-                for meta in product_meta:
-                    name = meta.get("name", "")
-                    if not name:
-                        continue
-                    score = fuzz.token_set_ratio(normalize(query), normalize(name))
-                    print(f"[DEBUG] Fuzzy score: {score:.2f} | '{name}'")
-                    if score > highest_score:
-                        best_match = meta
-                        highest_score = score
-
-                if best_match and (highest_score >= 80 or matched_from_semantic):
-                    print(f"[MATCH FOUND] Accepting fuzzy match: {best_match['name']} (Score: {highest_score})")
-                    matched = Document(page_content="No description available.", metadata=best_match)
-                else:
-                    print(f"[NO MATCH] Best fuzzy score: {highest_score}")
-                    return "I couldn’t find a product with that name. Please try rephrasing it."
-
-            last_product_doc = matched
+            # Compound questions ("compare X and Y", "gear oil and grease?") resolve every part at once
+            parts = split_compound_query(query)
+            if len(parts) > 1:
+                response = await aanswer_compound(query, query_vector, parts, snap, formatted_history, state)
+                if response:
+                    return response
+
+            resolved = await aresolve_product(query, query_vector, snap)
+            if isinstance(resolved, list):
+                return format_filtered_products(resolved, parse_filter_query(query, loose=True))
+            if resolved is None:
+                return "I couldn’t find a product with that name. Please try rephrasing it."
+            matched = resolved
+
+            state.last_product_doc = matched
             print(f"[NEW PRODUCT] Found: {matched.metadata.get('name')}")
 
         # --------- Build context and run product RAG chain ---------
@@ -229,47 +509,16 @@ def ask_bot(query: str, history: list[dict]) -> str:
         url = matched.metadata.get("url", "")
         category = matched.metadata.get("category", "Uncategorized")
         price = matched.metadata.get("price", "Contact us for pricing")
+        context = product_context(matched)
 
-        context = f"""Product Name: {name}
-Category: {category}
-Availability: Available in Pails and Drums
-URL: {url}
-
-Description:
-{matched.page_content}
-"""
-
-        # Retry mechanism
-        response = ""
-        for attempt in range(3):
-            try:
-                chain = rag_chain_followup if is_followup else rag_chain_product
-                response = chain.invoke({
-                    "question": query,
-                    "context": context,
-                    "history": formatted_history
-                })
-                if response:
-                    response = response.strip()
-                break
-            except Exception as e:
-                print(f"[RETRY {attempt + 1}] Product query failed:", e)
-                time.sleep(1)
-
-        if not response:
-            return "Sorry, I couldn’t process your product question right now. Please try again later."
-
-        # Clean price fallback if real price is available
-        if price != "Contact us for pricing":
-            patterns = [
-                r"(?i)as for pricing.*?\.",
-                r"(?i)price\s*[:\-–]?\s*(not available|n/a|unknown).*?(\n|$)",
-                r"(?i)unfortunately.*?(price|pricing).*?\.",
-                r"(?i)pricing.*?not.*?(available|provided).*?\.",
-                r"(?i)i don’t have.*?(price|pricing).*?\."
-            ]
-            for p in patterns:
-                response = re.sub(p, "", response).strip()
+        # Fast path: price / category / availability / link questions come straight from metadata
+        response = answer_structured(query, matched)
+        if response:
+            print(f"[FAST PATH] Answered from product metadata: {name}")
+        else:
+            response = await arun_product_chain(query, context, formatted_history, is_followup, price)
+            if not response:
+                return "Sorry, I couldn’t process your product question right now. Please try again later."
 
         # Final formatting
         response += f"\n\nPrice: {price}"
@@ -281,45 +530,41 @@ Description:
 
     # --------------------- GENERAL INTENT ---------------------
     try:
-        about_keywords = ["journey", "growth", "promise", "mission", "vision", "offer", "beginnings"]
-        contact_keywords = ["contact", "phone", "email", "reach you", "get in touch", "how do i contact", "customer service", "call you", "message", "speak with someone", "talk to support", "contact your company"]
-        query_lower = query.lower()
-
-        if any(k in query_lower for k in about_keywords):
-            print("[INFO] Keyword matches about page intent.")
-            raw = vectorstore._collection.get(include=["documents", "metadatas"])
+        if intent == "about":
+            print("[INFO] Routed to about page intent.")
+            raw = await offload(vectorstore._collection.get, include=["documents", "metadatas"])
             about_docs = [
                 doc for doc, meta in zip(raw["documents"], raw["metadatas"])
                 if meta.get("source") == "about" or "about" in meta.get("url", "")
             ]
             context = "\n".join(about_docs)[:5000]
-            response = rag_chain_general.invoke({
+            response = (await ainvoke_chain(rag_chain_general, {
                 "question": query,
                 "context": context,
                 "history": formatted_history
-            }).strip()
+            })).strip()
             response += "\n\nLearn more: https://www.silvestreph.com/about"
             return response
 
         # Contact page match
-        if any(k in query_lower for k in contact_keywords):
-            print("[INFO] Keyword matches contact page intent.")
-            raw = vectorstore._collection.get(include=["documents", "metadatas"])
+        if intent == "contact":
+            print("[INFO] Routed to contact page intent.")
+            raw = await offload(vectorstore._collection.get, include=["documents", "metadatas"])
             contact_docs = [
                 doc for doc, meta in zip(raw["documents"], raw["metadatas"])
                 if meta.get("source") == "contact" or "contact" in meta.get("url", "")
             ]
             context = "\n".join(contact_docs)[:5000]
-            response = rag_chain_general.invoke({
+            response = (await ainvoke_chain(rag_chain_general, {
                 "question": query,
                 "context": context,
                 "history": formatted_history
-            }).strip()
+            })).strip()
             response += "\n\nVisit: https://www.silvestreph.com/contact"
             return response
 
 
-        docs = retriever.get_relevant_documents(query)
+        docs = await aretrieve(query, query_vector, snap)
         context_docs = [d for d in docs if d.metadata.get("type") != "product"]
 
         relevance_scores = [
@@ -332,11 +577,11 @@ Description:
             return "Sorry, I couldn’t find information related to your question."
 
         context = "\n".join(d.page_content for d in context_docs)[:5000]
-        response = rag_chain_general.invoke({
+        response = (await ainvoke_chain(rag_chain_general, {
             "question": query,
             "context": context,
             "history": formatted_history
-        }).strip()
+        })).strip()
 
         if intent in GENERAL_PAGES:
             response += f"\n\nYou may also visit: {GENERAL_PAGES[intent]}"
@@ -348,11 +593,60 @@ Description:
 
 
 # PRODUCT LISTING
+def format_filtered_products(products: list[dict], filters: dict) -> str:
+    lines = [f"Here are the products matching {describe_filters(filters)}:\n"]
+    for p in products[:MAX_FILTER_RESULTS]:
+        price = p.get("price", "Contact us for pricing")
+        url = p.get("url", "")
+        lines.append(f"- {p.get('name', 'Unnamed Product')} — {price}" + (f" ({url})" if url else ""))
+    if len(products) > MAX_FILTER_RESULTS:
+        lines.append(f"\n...and {len(products) - MAX_FILTER_RESULTS} more. Add a price range or grade to narrow it down.")
+    return "\n".join(lines)
+
+PRODUCT_PAGE_LINE = re.compile(r"^Product Page:\s*(\S+)", re.MULTILINE)
+
+def state_from_history(history: list[dict]) -> ConversationState:
+    """
+    Rebuilds follow-up memory for stateless callers (HTTP) from the answers in `history`:
+    the last product answered about is the one in the latest assistant message's footer.
+    """
+    state = ConversationState()
+    answers = [m.get("content") or "" for m in history if isinstance(m, dict) and m.get("role") == "assistant"]
+    if not answers:
+        return state
+    urls = PRODUCT_PAGE_LINE.findall(str(answers[-1]))
+    # Compound answers list several products and leave nothing to follow up on
+    if len(urls) != 1:
+        return state
+
+    with live_store.acquire() as snap:
+        doc = snap.parent_document(product_parent_id(urls[0]))
+        if doc is None:
+            record = next((r for r in snap.product_records() if r.get("url") == urls[0]), None)
+            if record:
+                doc = snap.resolve_parent(Document(page_content="No description available.", metadata=record))
+    if doc is None:
+        return state
+
+    state.last_product_doc = doc
+    state.last_intent = "product"
+    # Earlier answers about the same product count toward the follow-up window
+    for answer in reversed(answers[:-1]):
+        if PRODUCT_PAGE_LINE.findall(str(answer)) != urls:
+            break
+        state.followup_count += 1
+    return state
+
+def suggest_products(text: str, limit: int = 5) -> list[tuple[str, int]]:
+    """Typeahead for the chat entry: (product name, trailing words it replaces)."""
+    with live_store.acquire() as snap:
+        return snap.completer.suggest(text, limit)
+
 def get_all_products():
     """Returns 3–5 random products per category from the vectorstore."""
     try:
-        raw = vectorstore._collection.get(include=["metadatas"])
-        product_meta = [m for m in raw["metadatas"] if m.get("type") == "product"]
+        with live_store.acquire() as snap:
+            product_meta = snap.product_records()
 
         categories = defaultdict(list)
         for meta in product_meta:
@@ -377,9 +671,16 @@ def get_all_products():
         print("[ERROR] Failed to fetch products from vectorstore:", e)
         return "Sorry, I couldn’t fetch the product list at the moment."
 
+def warm_up():
+    """Loads the live store, product facets/typeahead and intent centroids before serving traffic."""
+    with live_store.acquire() as snap:
+        snap.completer
+    try:
+        intent_classifier.ensure_loaded()
+    except Exception as e:
+        print("[WARN] Intent centroids not loaded; keyword routing will be used:", e)
+
 def reload_vectorstore():
-    global vectorstore, retriever
-    vectorstore = load_vectorstore()
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
+    live_store.reload()
     print("[INFO] Vectorstore reloaded in memory.")
 
@@ -1,9 +1,11 @@
 import os
-import uuid
 from dotenv import load_dotenv
 from langchain_community.vectorstores import Chroma
-from langchain_cohere import CohereEmbeddings
-from db import load_all_documents  
+from db import iter_documents, ParentsWriter
+from vectorstore_utils import make_embeddings, new_version_path, publish_version, validate_vectorstore, gc_versions
+from vectorstore_utils import stream_into_vectorstore
+from local_index import LOCAL_INDEX_MODE, export_local_index
+from name_index import build_name_index
 
 # Load env vars
 load_dotenv()
@@ -13,29 +15,31 @@ if not COHERE_TOKEN:
     raise ValueError("❌ Missing Cohere API Key. Check your .env file.")
 
 
-print("🌐 Scraping Silvestre website for product and general info...")
-docs = load_all_documents()
-print("✅ Scraping complete")
-
-
 print("⏳ Rebuilding vectorstore with Cohere embeddings...")
 
-embeddings = CohereEmbeddings(
-    cohere_api_key=COHERE_TOKEN,
-    model="embed-multilingual-v3.0"
-)
+embeddings = make_embeddings()
 print("[INFO] Using Cohere for embedding")
 
-num_products = sum(1 for d in docs if d.metadata.get("type") == "product")
-num_general = len(docs) - num_products
-print(f"[INFO] Loaded {num_products} product documents and {num_general} general documents for embedding.")
+# Build into a fresh version directory so running chat sessions are never disturbed
+target_path = new_version_path()
+vectorstore = Chroma(persist_directory=target_path, embedding_function=embeddings)
 
-vectorstore = Chroma.from_documents(
-    documents=docs,
-    embedding=embeddings,
-    ids=[str(uuid.uuid4()) for _ in docs],
-    persist_directory="chroma_db"
-)
+# Pages are chunked, embedded and written while scraping continues
+print("🌐 Scraping Silvestre website for product and general info...")
+parents = ParentsWriter(target_path)
+stats = stream_into_vectorstore(iter_documents(), vectorstore, embeddings, set(), parents)
+print("✅ Scraping complete")
+print(f"[INFO] Embedded {stats['products']} product documents and {stats['general']} general documents.")
 
 vectorstore.persist()
-print("✅ Vectorstore rebuilt successfully and saved to chroma_db/")
+parents.close()
+build_name_index(target_path, parents.summaries, embeddings)
+if not validate_vectorstore(vectorstore):
+    raise SystemExit(f"❌ Rebuilt vectorstore at {target_path}/ failed validation; not publishing.")
+
+if LOCAL_INDEX_MODE != "off":
+    export_local_index(vectorstore, target_path)
+
+publish_version(target_path)
+gc_versions()
+print(f"✅ Vectorstore rebuilt successfully and saved to {target_path}/")
@@ -0,0 +1,245 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from api_scheduler import TokenBucket
+
+# Opt-in per-request profiling: PROFILE_REQUESTS=1 profiles every request (subject to the rate
+# limit); otherwise only requests that ask for it (e.g. ask_bot(..., profile=True)).
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_PER_MINUTE = float(os.getenv("PROFILE_MAX_PER_MINUTE", "6"))
+PROFILE_ALLOCATIONS = os.getenv("PROFILE_ALLOCATIONS", "1") == "1"
+TOP_ALLOCATIONS = 15
+
+_limiter = TokenBucket(PROFILE_MAX_PER_MINUTE / 60.0, max(1.0, PROFILE_MAX_PER_MINUTE))
+_limiter_lock = threading.Lock()
+# tracemalloc and the sampler are process-wide, so only one request is profiled at a time
+_active = threading.Lock()
+# Requests currently inside profile_request (profiled or not), to flag shared measurements
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+# The sampler of the request (task) being profiled, seen by offload() through the context
+_current_sampler: ContextVar["StackSampler | None"] = ContextVar("profile_sampler", default=None)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _thread_stack(frame) -> list[str]:
+    """Frame names from the outermost frame down to `frame`."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return list(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples one request's stacks at a fixed interval into collapsed-stack counts.
+    Thread mode follows the calling thread. Task mode follows an asyncio task's own coroutine
+    chain (not whatever else the event loop is running), plus the executor threads doing its
+    offload() calls; a suspended task is recorded at its await point, so samples are wall time.
+    """
+
+    def __init__(self, thread_id: int, interval: float, task: asyncio.Task | None = None):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.task = task
+        self.stacks = Counter()
+        self.samples = 0
+        self.offload_threads: dict[int, str] = {}
+        self.offload_seconds = Counter()
+        self.offload_calls = Counter()
+        self.peak_in_flight = 1
+        self._stop_event = threading.Event()
+
+    def _task_stack(self, frames) -> list[str] | None:
+        coro = self.task.get_coro()
+        names, innermost = [], None
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is None:
+                break
+            names.append(_frame_name(frame))
+            innermost = frame
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        if innermost is None:
+            return None
+
+        # Running right now: add the synchronous calls made from the innermost coroutine
+        top = frames.get(self.thread_id)
+        below = []
+        frame = top
+        while frame is not None and frame is not innermost:
+            below.append(_frame_name(frame))
+            frame = frame.f_back
+        if frame is innermost:
+            return names + list(reversed(below))
+        return names + [f"[await {type(coro).__name__}]" if coro is not None else "[suspended]"]
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            self.peak_in_flight = max(self.peak_in_flight, _in_flight)
+            if self.task is None:
+                frame = frames.get(self.thread_id)
+                if frame is None:
+                    continue
+                self.stacks[";".join(_thread_stack(frame))] += 1
+                self.samples += 1
+                continue
+
+            if self.task.done():
+                continue
+            stack = self._task_stack(frames)
+            if stack:
+                self.stacks[";".join(stack)] += 1
+                self.samples += 1
+            for thread_id, label in list(self.offload_threads.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[";".join([f"[offload {label}]"] + _thread_stack(frame))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+async def offload(fn, *args, **kwargs):
+    """
+    asyncio.to_thread that, inside a profiled request, samples the worker thread and records
+    the call's wall time under the request's profile.
+    """
+    sampler = _current_sampler.get()
+    if sampler is None:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    label = getattr(fn, "__qualname__", type(fn).__name__)
+
+    def run():
+        thread_id = threading.get_ident()
+        sampler.offload_threads[thread_id] = label
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            sampler.offload_threads.pop(thread_id, None)
+
+    start = time.perf_counter()
+    try:
+        return await asyncio.to_thread(run)
+    finally:
+        sampler.offload_seconds[label] += time.perf_counter() - start
+        sampler.offload_calls[label] += 1
+
+
+def _should_profile(requested: bool | None) -> bool:
+    if not (PROFILE_REQUESTS if requested is None else requested):
+        return False
+    with _limiter_lock:
+        return _limiter.take() == 0
+
+
+def _write_report(label: str, sampler: StackSampler, seconds: float, allocations, peak: int | None):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^\w]+", "-", label.lower()).strip("-")[:40] or "request"
+    base = os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{slug}")
+
+    # Collapsed stacks: feed to flamegraph.pl or speedscope
+    with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write(f"request: {label}\n")
+        f.write(f"wall time: {seconds:.3f}s\n")
+        f.write(f"samples: {sampler.samples} every {PROFILE_INTERVAL_MS:g} ms "
+                f"({'task' if sampler.task is not None else 'thread'} mode)\n")
+        shared = sampler.peak_in_flight > 1
+        f.write(f"requests in flight: up to {sampler.peak_in_flight}\n")
+        if sampler.offload_calls:
+            f.write("\noffloaded calls (wall time):\n")
+            for call, spent in sampler.offload_seconds.most_common():
+                f.write(f"  {spent:8.3f}s  {sampler.offload_calls[call]:4d}x  {call}\n")
+        if peak is not None:
+            note = " (process-wide; includes other in-flight requests)" if shared else ""
+            f.write(f"\npeak traced memory: {peak / 1024:.1f} KiB{note}\n")
+        if allocations:
+            note = "process-wide, other requests were in flight" if shared else "net change during request"
+            f.write(f"\ntop {len(allocations)} allocation sites ({note}):\n")
+            for stat in allocations:
+                f.write(f"  {stat}\n")
+    print(f"[PROFILE] {seconds:.3f}s, {sampler.samples} samples -> {base}.collapsed")
+
+
+@contextmanager
+def _counted():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+    try:
+        yield
+    finally:
+        with _in_flight_lock:
+            _in_flight -= 1
+
+
+@contextmanager
+def profile_request(label: str, requested: bool | None = None):
+    """
+    Profiles the request for the duration of the block when enabled (env or `requested=True`),
+    not rate-limited, and no other request is being profiled. Entered inside a coroutine, it
+    follows that task (see StackSampler); blocking work should go through offload().
+    """
+    with _counted():
+        if not _should_profile(requested) or not _active.acquire(blocking=False):
+            yield
+            return
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        started_tracing = False
+        before = None
+        try:
+            if PROFILE_ALLOCATIONS:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    started_tracing = True
+                tracemalloc.reset_peak()
+                before = tracemalloc.take_snapshot()
+            sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000.0, task)
+            token = _current_sampler.set(sampler)
+            sampler.start()
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                seconds = time.perf_counter() - start
+                sampler.stop()
+                _current_sampler.reset(token)
+                allocations, peak = None, None
+                if before is not None:
+                    after = tracemalloc.take_snapshot()
+                    allocations = after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]
+                    peak = tracemalloc.get_traced_memory()[1]
+                try:
+                    _write_report(label, sampler, seconds, allocations, peak)
+                except OSError as e:
+                    print("[WARN] Could not write profile:", e)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            _active.release()
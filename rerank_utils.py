@@ -0,0 +1,60 @@
+import os
+import numpy as np
+from langchain_core.documents import Document
+
+# Retrieval over-fetches a candidate pool, then keeps a small diverse context: maximal marginal
+# relevance trades query relevance against similarity to what is already picked, and no single
+# page/product contributes more than MAX_PER_SOURCE chunks. RERANK_FETCH_K=0 turns it off.
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "20"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.6"))
+MAX_PER_SOURCE = int(os.getenv("MAX_PER_SOURCE", "2"))
+
+
+def source_key(metadata: dict) -> str:
+    """Product children share a parent; general chunks share their page."""
+    return str(metadata.get("parent_id") or metadata.get("url") or metadata.get("source") or "")
+
+
+def mmr_select(query_vector, vectors, k: int, lambda_mult: float = MMR_LAMBDA,
+               sources: list[str] | None = None, max_per_source: int = MAX_PER_SOURCE) -> list[int]:
+    """
+    Greedy MMR over candidate rows. Relevance and the pairwise similarity matrix are computed
+    in one matrix product each; every pick is then a masked argmax over the whole pool.
+    """
+    v = np.asarray(vectors, dtype=np.float32)
+    if v.ndim != 2 or not len(v):
+        return []
+    v = v / np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-12)
+    q = np.asarray(query_vector, dtype=np.float32)
+    q = q / (np.linalg.norm(q) or 1.0)
+
+    relevance = v @ q
+    similarity = v @ v.T
+    available = np.ones(len(v), dtype=bool)
+    redundancy = np.zeros(len(v), dtype=np.float32)
+    source_ids = None
+    if sources is not None and max_per_source > 0:
+        _, source_ids = np.unique(np.array(sources, dtype=str), return_inverse=True)
+        picked_per_source = np.zeros(source_ids.max() + 1, dtype=int)
+
+    selected = []
+    while len(selected) < k and available.any():
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        row = int(np.argmax(np.where(available, scores, -np.inf)))
+        selected.append(row)
+        available[row] = False
+        # Redundancy: each candidate's highest similarity to anything picked so far
+        redundancy = similarity[row] if len(selected) == 1 else np.maximum(redundancy, similarity[row])
+        if source_ids is not None:
+            sid = source_ids[row]
+            picked_per_source[sid] += 1
+            if picked_per_source[sid] >= max_per_source:
+                available &= source_ids != sid
+    return selected
+
+
+def mmr_rerank(query_vector, docs: list[Document], vectors, k: int) -> list[Document]:
+    if len(docs) <= 1:
+        return docs[:k]
+    rows = mmr_select(query_vector, vectors, k, sources=[source_key(d.metadata) for d in docs])
+    return [docs[row] for row in rows]
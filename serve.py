@@ -0,0 +1,302 @@
+"""
+Pre-fork HTTP serving for ask_bot (POSIX only).
+
+    python serve.py --workers 4 --port 8000
+
+The supervisor loads the vectorstore, product records and intent centroids once, then forks
+workers that share them copy-on-write (the optional local index is mmap'd and shared outright).
+All workers accept on one listening socket.
+
+    POST /ask      {"query": "...", "history": [{"role": "user", "content": "..."}], "profile": false}
+    GET  /healthz
+
+Requests are stateless: follow-up context comes from the `history` the client sends, including
+the product the last answer was about (its "Product Page:" footer line).
+SIGHUP, or a newly published vectorstore version, triggers a rolling reload of the workers.
+The API limits in api_scheduler are split evenly between the workers, so the pool as a whole
+stays within them. A worker only heartbeats while its event loop is responsive.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import errno
+import select
+import signal
+import socket
+import asyncio
+import argparse
+import threading
+import concurrent.futures
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import rag_chain
+from api_scheduler import split_limits
+from vectorstore_utils import live_store, current_version_path
+
+HEARTBEAT_INTERVAL = 2.0
+HEARTBEAT_TIMEOUT = 30.0
+LOOP_PROBE_TIMEOUT = 10.0
+VERSION_POLL_INTERVAL = 5.0
+MAX_BODY_BYTES = 64 * 1024
+
+
+class AskHandler(BaseHTTPRequestHandler):
+    server_version = "SilvestreBot/1.0"
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok", "pid": os.getpid(), "version": live_store.current_path()})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/ask":
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self._send_json(400, {"error": "missing or oversized body"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            query = str(payload["query"]).strip()
+            history = payload.get("history") or []
+            if not isinstance(history, list):
+                raise TypeError("history must be a list")
+            profile = True if payload.get("profile") else None
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": "expected JSON with a 'query' field"})
+            return
+
+        start = time.perf_counter()
+        try:
+            state = rag_chain.state_from_history(history)
+            answer = rag_chain.ask_bot(query, history, state, profile=profile)
+        except Exception as e:
+            print(f"[ERROR] Worker {os.getpid()} failed on query:", e)
+            self._send_json(500, {"error": "internal error"})
+            return
+        self._send_json(200, {"answer": answer, "seconds": round(time.perf_counter() - start, 4)})
+
+    def log_message(self, format, *args):
+        print(f"[HTTP {os.getpid()}] {self.address_string()} {format % args}")
+
+
+def run_worker(sock: socket.socket, heartbeat_fd: int, num_workers: int = 1):
+    """Worker body: serve on the inherited socket until SIGTERM, then finish in-flight requests."""
+    live_store.after_fork()
+    rag_chain.after_fork()
+    split_limits(num_workers)
+    server = ThreadingHTTPServer(sock.getsockname()[:2], AskHandler, bind_and_activate=False)
+    server.socket = sock
+    server.daemon_threads = False          # let in-flight requests finish on shutdown
+    server.block_on_close = True
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    def beat():
+        while True:
+            # Beat only once the bot loop runs a no-op; a blocked loop stops the heartbeat
+            probe = asyncio.run_coroutine_threadsafe(asyncio.sleep(0), rag_chain.bot_loop())
+            try:
+                probe.result(timeout=LOOP_PROBE_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                probe.cancel()
+                print(f"[WARN] Worker {os.getpid()} bot loop unresponsive for {LOOP_PROBE_TIMEOUT:g}s")
+                continue
+            try:
+                os.write(heartbeat_fd, b".")
+            except OSError:
+                return
+            time.sleep(HEARTBEAT_INTERVAL)
+    threading.Thread(target=beat, daemon=True).start()
+
+    print(f"[WORKER {os.getpid()}] Serving on {sock.getsockname()}")
+    server.serve_forever()
+    server.server_close()
+
+
+class Supervisor:
+    def __init__(self, host: str, port: int, workers: int):
+        self.num_workers = workers
+        self.sock = socket.create_server((host, port), reuse_port=False, backlog=128)
+        self.workers: dict[int, dict] = {}      # pid -> {"fd": read end, "last_beat": t}
+        self.reload_requested = False
+        self.stopping = False
+        self.loaded_version = None
+
+    # --- loading ---
+    def load(self):
+        rag_chain.warm_up()
+        self.loaded_version = current_version_path()
+        # Move everything loaded so far out of the collector's reach so it is not
+        # touched (and copied) by GC passes in the workers
+        gc.collect()
+        gc.freeze()
+
+    # --- workers ---
+    def spawn(self) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for info in self.workers.values():
+                os.close(info["fd"])
+            code = 0
+            try:
+                run_worker(self.sock, write_fd, self.num_workers)
+            except Exception as e:
+                print(f"[WORKER {os.getpid()}] Crashed:", e)
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        self.workers[pid] = {"fd": read_fd, "last_beat": time.monotonic()}
+        return pid
+
+    def forget(self, pid: int):
+        info = self.workers.pop(pid, None)
+        if info:
+            os.close(info["fd"])
+
+    def stop_worker(self, pid: int):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.forget(pid)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                print(f"[SUPERVISOR] Worker {pid} exited (status {status})")
+                self.forget(pid)
+
+    def read_heartbeats(self, timeout: float):
+        fds = {info["fd"]: pid for pid, info in self.workers.items()}
+        if not fds:
+            time.sleep(timeout)
+            return
+        try:
+            ready, _, _ = select.select(list(fds), [], [], timeout)
+        except InterruptedError:
+            return
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                return
+            raise
+        now = time.monotonic()
+        for fd in ready:
+            try:
+                data = os.read(fd, 1024)
+            except OSError:
+                continue
+            pid = fds[fd]
+            # EOF means the worker is gone; reap() will notice
+            if data and pid in self.workers:
+                self.workers[pid]["last_beat"] = now
+
+    def check_health(self):
+        now = time.monotonic()
+        for pid, info in list(self.workers.items()):
+            if now - info["last_beat"] > HEARTBEAT_TIMEOUT:
+                print(f"[SUPERVISOR] Worker {pid} missed heartbeats; killing it.")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self.forget(pid)
+
+    def rolling_reload(self):
+        """Reload in the supervisor, then replace workers one at a time so capacity never drops to zero."""
+        print("[SUPERVISOR] Reloading knowledge base...")
+        gc.unfreeze()
+        live_store.reload()
+        self.load()
+        # Heartbeats were not read while loading; don't mistake that for hung workers
+        now = time.monotonic()
+        for info in self.workers.values():
+            info["last_beat"] = now
+        for pid in list(self.workers):
+            self.spawn()
+            self.stop_worker(pid)
+        print(f"[SUPERVISOR] Workers now serving `{self.loaded_version}`")
+
+    # --- main loop ---
+    def run(self):
+        signal.signal(signal.SIGHUP, lambda s, f: setattr(self, "reload_requested", True))
+        signal.signal(signal.SIGTERM, lambda s, f: setattr(self, "stopping", True))
+        signal.signal(signal.SIGINT, lambda s, f: setattr(self, "stopping", True))
+
+        self.load()
+        for _ in range(self.num_workers):
+            self.spawn()
+        print(f"[SUPERVISOR] {self.num_workers} workers on {self.sock.getsockname()}")
+
+        last_poll = time.monotonic()
+        while not self.stopping:
+            self.read_heartbeats(HEARTBEAT_INTERVAL)
+            self.reap()
+            self.check_health()
+
+            if time.monotonic() - last_poll > VERSION_POLL_INTERVAL:
+                last_poll = time.monotonic()
+                if current_version_path() != self.loaded_version:
+                    self.reload_requested = True
+
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_reload()
+
+            # Keep the pool at full size (crashed or killed workers are replaced here)
+            while len(self.workers) < self.num_workers and not self.stopping:
+                self.spawn()
+
+        print("[SUPERVISOR] Shutting down workers...")
+        for pid in list(self.workers):
+            self.stop_worker(pid)
+        deadline = time.monotonic() + HEARTBEAT_TIMEOUT
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve ask_bot over HTTP with pre-forked workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        print("❌ serve.py needs os.fork (Linux/macOS). Use main.py or batch_answer.py on Windows.")
+        return 1
+    Supervisor(args.host, args.port, max(1, args.workers)).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import re
+from langchain_core.documents import Document
+from facet_index import PACK_SIZE, extract_pack_sizes
+
+# Follow-up questions answerable from product metadata alone, without an LLM round-trip
+PRICE_PATTERN = re.compile(r"\b(how much|price|pricing|cost|costs|magkano|presyo)\b", re.IGNORECASE)
+CATEGORY_PATTERN = re.compile(r"\b(category|categories|what (kind|type) of product|classified)\b", re.IGNORECASE)
+AVAILABILITY_PATTERN = re.compile(
+    r"\b(available|availability|in stock|pails?|drums?|sizes?|packaging|pack|volume)\b", re.IGNORECASE
+)
+CONTAINER_PATTERN = re.compile(r"\b(pails?|drums?)\b", re.IGNORECASE)
+LINK_PATTERN = re.compile(
+    r"\b(link|url|website|product page|where (can|do) i (buy|order|get|see))\b", re.IGNORECASE
+)
+
+# Anything that asks for reasoning or advice still goes to the LLM
+NEEDS_GENERATION = re.compile(
+    r"\b(why|compare|comparison|difference|better|recommend|suitable|suit|use (it )?for|how (do|to|does)|"
+    r"explain|specs?|specifications?|viscosity|compatible|replace|instead|vs|versus|benefits?)\b",
+    re.IGNORECASE
+)
+
+# Words that carry no question of their own once the structured phrases are removed
+FILLER_WORDS = {
+    "a", "an", "the", "this", "that", "these", "those", "it", "its", "is", "are", "was", "be",
+    "what", "whats", "s", "how", "much", "does", "do", "did", "you", "your", "have", "has", "can", "could",
+    "i", "we", "me", "my", "please", "and", "or", "of", "in", "on", "for", "to", "at", "by", "with",
+    "there", "any", "come", "comes", "sold", "offered", "again", "just", "so", "then", "now", "here",
+    "po", "ba", "ang", "yung", "ng", "sa", "lang", "nga", "silvestre"
+}
+
+DEFAULT_AVAILABILITY = "Available in Pails and Drums"
+NO_PRICE_VALUES = {"contact us for pricing", "n/a", "not available", ""}
+
+
+def availability_of(doc: Document) -> str:
+    match = re.search(r"Availability:\s*(.+)", doc.page_content)
+    return match.group(1).strip() if match else DEFAULT_AVAILABILITY
+
+
+def pack_sizes_of(doc: Document) -> list[str]:
+    """Pack sizes stored on the parent record at scrape time (read from the text for older stores)."""
+    attributes = doc.metadata.get("attributes")
+    if isinstance(attributes, dict) and "pack_sizes" in attributes:
+        return list(attributes["pack_sizes"])
+    return extract_pack_sizes(doc.page_content)
+
+
+def unanswered_words(query: str, names: list[str]) -> list[str]:
+    """Words of the question left after removing product names, structured phrases and filler."""
+    text = query.lower()
+    for pattern in (PRICE_PATTERN, CATEGORY_PATTERN, AVAILABILITY_PATTERN, LINK_PATTERN, PACK_SIZE):
+        text = pattern.sub(" ", text)
+    name_words = set(re.findall(r"\w+", " ".join(names).lower()))
+    return [w for w in re.findall(r"\w+", text) if w not in name_words and w not in FILLER_WORDS]
+
+
+def answer_structured(query: str, doc: Document, other_names: list[str] = ()) -> str | None:
+    """
+    Templated answer for price / category / availability / link questions about `doc`.
+    Returns None when the question asks anything else (names in `other_names` don't count).
+    """
+    if NEEDS_GENERATION.search(query):
+        return None
+
+    name = doc.metadata.get("name", "this product")
+    leftover = unanswered_words(query, [name, *other_names])
+    if leftover:
+        print(f"[FAST PATH] Skipped; question also asks about: {' '.join(leftover)}")
+        return None
+
+    price = doc.metadata.get("price", "Contact us for pricing")
+    asked_sizes = extract_pack_sizes(query)
+    lines = []
+
+    if PRICE_PATTERN.search(query):
+        if price.strip().lower() in NO_PRICE_VALUES:
+            lines.append(f"For {name}, please contact us for pricing and we'll be glad to send you a quote.")
+        else:
+            lines.append(f"{name} is priced at {price}.")
+    if AVAILABILITY_PATTERN.search(query) or asked_sizes:
+        sizes = pack_sizes_of(doc)
+        if CONTAINER_PATTERN.search(query) and not asked_sizes:
+            # "Available in pails and drums?" asks about containers: answer with the availability line
+            availability = availability_of(doc).rstrip(".")
+            line = f"{name} is {availability[:1].lower()}{availability[1:]}."
+            if sizes:
+                line += f" Listed sizes: {', '.join(sizes)}."
+            lines.append(line)
+        elif sizes:
+            line = f"{name} comes in {', '.join(sizes)}."
+            missing = [size for size in asked_sizes if size not in sizes]
+            if missing:
+                line += f" {' or '.join(missing)} {'is' if len(missing) == 1 else 'are'} not listed for it."
+            lines.append(line)
+        elif asked_sizes:
+            # Specific sizes we have no data for; let the LLM answer from the description
+            return None
+        else:
+            availability = availability_of(doc).rstrip(".")
+            lines.append(f"{name} is {availability[:1].lower()}{availability[1:]}.")
+    if CATEGORY_PATTERN.search(query):
+        lines.append(f"{name} is listed under {doc.metadata.get('category', 'Uncategorized')}.")
+    if LINK_PATTERN.search(query):
+        # The product page URL itself is appended by ask_bot's footer
+        if not doc.metadata.get("url"):
+            return None
+        lines.append(f"You can view and order {name} on its product page below.")
+
+    if not lines:
+        return None
+    return " ".join(lines)
@@ -0,0 +1,23 @@
+import unittest
+
+from autocomplete import NameCompleter
+
+NAMES = ["Hydraulic Oil AW 68", "Silvestre Motorcycle Oil 10W-40", "Gear Oil 90", "SAE 40 Engine Oil"]
+
+
+class NameCompleterTest(unittest.TestCase):
+    def setUp(self):
+        self.completer = NameCompleter(NAMES)
+
+    def test_generic_last_word_does_not_suggest_arbitrary_products(self):
+        suggestions = self.completer.suggest("do you have motorcyle oil")
+        self.assertEqual(suggestions, [("Silvestre Motorcycle Oil 10W-40", 2)])
+
+    def test_misspelling_and_prefix_still_suggest(self):
+        self.assertEqual(self.completer.suggest("hydrolic")[0], ("Hydraulic Oil AW 68", 1))
+        self.assertEqual(self.completer.suggest("i need gear")[0], ("Gear Oil 90", 1))
+        self.assertEqual(self.completer.suggest("sae 40 eng")[0], ("SAE 40 Engine Oil", 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import http_cache
+from live_scraper import scrape_product_page
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PRODUCT_URL = "https://www.silvestreph.com/product-page/silvestre-gear-oil-ep-90"
+
+
+class ScrapeProductPageReplayTest(unittest.TestCase):
+    """Parses a recorded product page from the HTTP cache without touching the network."""
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        for name, value in (("HTTP_CACHE_DIR", cache_dir.name), ("HTTP_CACHE_MODE", "replay")):
+            patcher = mock.patch.object(http_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        with open(os.path.join(FIXTURES, "product_page.html"), encoding="utf-8") as f:
+            html = f.read()
+        http_cache._write(PRODUCT_URL, http_cache.CachedResponse(PRODUCT_URL, 200, html))
+
+    def test_parses_recorded_page(self):
+        data = scrape_product_page(PRODUCT_URL, "Automotive Lubricants")
+
+        self.assertEqual(data["name"], "Silvestre Gear Oil EP 90")
+        self.assertEqual(data["price"], "₱1,850.00")
+        self.assertEqual(data["category"], "Automotive Lubricants")
+        self.assertEqual(data["url"], PRODUCT_URL)
+        self.assertTrue(data["description"].startswith(
+            "Extreme-pressure gear oil for manual transmissions and differentials.\n\n"
+            "SAE 90, available in 4L and 18L."
+        ))
+        self.assertIn("Price: ₱1,850.00", data["content"])
+
+    def test_unrecorded_page_is_not_fetched(self):
+        with mock.patch.object(http_cache._session, "get") as get:
+            self.assertIsNone(scrape_product_page(PRODUCT_URL + "-missing"))
+        get.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from name_index import NameIndex
+from query_decomposition import split_compound_query, names_whole_query
+
+ALIASES = ["Silvestre Gear Oil EP 90", "Silvestre Marine Grease NLGI 2", "Gear & Chain Oil"]
+PARENT_IDS = ["p1", "p2", "p3"]
+
+
+class CompoundQueryTest(unittest.TestCase):
+    """The name index sees full names inside a compound question; only the split decides."""
+
+    def setUp(self):
+        self.vectors = np.eye(len(ALIASES), dtype=np.float32)
+        self.names = NameIndex(self.vectors, ALIASES, PARENT_IDS)
+
+    def resolve_parts(self, parts: list[str], part_vectors) -> set[str]:
+        hits = [self.names.resolve(part, vector) for part, vector in zip(parts, part_vectors)]
+        return {hit[0] for hit in hits if hit}
+
+    def test_full_names_resolve_as_two_products(self):
+        query = "compare Silvestre Gear Oil EP 90 and Silvestre Marine Grease NLGI 2 prices"
+        parts = split_compound_query(query)
+        self.assertEqual(parts, ["Silvestre Gear Oil EP 90", "Silvestre Marine Grease NLGI 2"])
+        self.assertEqual(self.resolve_parts(parts, self.vectors[:2]), {"p1", "p2"})
+
+        # The whole question also resolves, to one of the names it contains...
+        whole = self.names.match(query, self.vectors[0] + self.vectors[1])
+        self.assertEqual(whole[:2], ("p1", 100))
+        # ...but that name doesn't span the "and", so the question stays compound
+        self.assertFalse(names_whole_query(whole[2], query))
+
+    def test_name_containing_a_connective_stays_whole(self):
+        query = "how much is the Gear & Chain Oil?"
+        self.assertEqual(len(split_compound_query(query)), 2)
+
+        whole = self.names.match(query, self.vectors[2])
+        self.assertEqual(whole[0], "p3")
+        self.assertTrue(names_whole_query(whole[2], query))
+
+
+if __name__ == "__main__":
+    unittest.main()
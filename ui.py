@@ -7,7 +7,11 @@ import time
 import traceback
 import threading
 from datetime import datetime
-from rag_chain import ask_bot, detect_intent
+from concurrent.futures import ThreadPoolExecutor
+from rag_chain import submit_ask, detect_intent, suggest_products
+
+AUTOCOMPLETE_DELAY_MS = 120
+AUTOCOMPLETE_LIMIT = 4
 
 def resource_path(relative_path):
     """ Get absolute path to resource (for PyInstaller compatibility) """
@@ -23,6 +27,8 @@ class ChatApp(ctk.CTk):
         self.resizable(False, False) 
         ctk.set_appearance_mode("light")
         self.chat_history = []
+        self.pending_request = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Chat area
         self.chat_frame = ctk.CTkFrame(self, fg_color="white")
@@ -45,6 +51,17 @@ class ChatApp(ctk.CTk):
         self.entry = ctk.CTkEntry(self.entry_frame, placeholder_text="Type your message here...")
         self.entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
         self.entry.bind("<Return>", self.send_message)
+        self.entry.bind("<KeyRelease>", self.schedule_suggestions)
+        self.entry.bind("<Tab>", self.accept_first_suggestion)
+        self.entry.bind("<Escape>", lambda e: self.hide_suggestions())
+
+        # Product-name suggestions, shown between the chat and the entry
+        self.suggest_frame = ctk.CTkFrame(self, fg_color="white")
+        self.suggestions = []
+        self.suggest_job = None
+        self.suggest_generation = 0
+        # One background worker: lookups never block typing, and stale ones are discarded
+        self.suggest_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autocomplete")
 
         self.send_btn = ctk.CTkButton(self.entry_frame, text="Send", command=self.send_message)
         self.send_btn.pack(side="right")
@@ -84,10 +101,78 @@ class ChatApp(ctk.CTk):
 
 
 
+    def schedule_suggestions(self, event=None):
+        if event is not None and event.keysym in ("Return", "Tab", "Escape", "Up", "Down", "Left", "Right"):
+            return
+        # Debounce: only look up once typing pauses
+        if self.suggest_job is not None:
+            self.after_cancel(self.suggest_job)
+        self.suggest_job = self.after(AUTOCOMPLETE_DELAY_MS, self.request_suggestions)
+
+    def request_suggestions(self):
+        self.suggest_job = None
+        self.suggest_generation += 1
+        generation = self.suggest_generation
+        text = self.entry.get()
+
+        def lookup():
+            try:
+                found = suggest_products(text, AUTOCOMPLETE_LIMIT)
+            except Exception as e:
+                print("[WARN] Autocomplete failed:", e)
+                found = []
+            self.after(0, lambda: self.show_suggestions(generation, text, found))
+
+        self.suggest_pool.submit(lookup)
+
+    def show_suggestions(self, generation, text, found):
+        # Ignore results for text the user has already changed
+        if generation != self.suggest_generation or self.entry.get() != text:
+            return
+        for child in self.suggest_frame.winfo_children():
+            child.destroy()
+        self.suggestions = found
+        if not found:
+            self.suggest_frame.pack_forget()
+            return
+        for name, replaced in found:
+            ctk.CTkButton(
+                self.suggest_frame,
+                text=name,
+                fg_color="#E4E6EB",
+                text_color="black",
+                hover_color="#D0D2D6",
+                anchor="w",
+                height=24,
+                command=lambda n=name, r=replaced: self.apply_suggestion(n, r)
+            ).pack(fill="x", padx=4, pady=1)
+        self.suggest_frame.pack(fill="x", padx=10, before=self.entry_frame)
+
+    def hide_suggestions(self):
+        self.suggest_generation += 1
+        self.suggestions = []
+        self.suggest_frame.pack_forget()
+
+    def apply_suggestion(self, name, replaced):
+        words = self.entry.get().split()
+        kept = words[:max(0, len(words) - replaced)]
+        self.entry.delete(0, "end")
+        self.entry.insert(0, " ".join(kept + [name]))
+        self.hide_suggestions()
+        self.entry.focus_set()
+        self.entry.icursor("end")
+
+    def accept_first_suggestion(self, event=None):
+        if not self.suggestions:
+            return None
+        self.apply_suggestion(*self.suggestions[0])
+        return "break"
+
     def send_message(self, event=None):
         user_msg = self.entry.get().strip()
         if not user_msg:
             return
+        self.hide_suggestions()
 
         self.add_bubble(user_msg, "user")
         self.update_idletasks()
@@ -98,18 +183,22 @@ class ChatApp(ctk.CTk):
         # Show placeholder while bot is typing
         typing_bubble = self.add_bubble("Typing...", "bot")
 
-        def run_response():
+        def on_response(future):
+            # The window was closed; nothing left to update
+            if future.cancelled():
+                return
             try:
-                response = ask_bot(user_msg, self.chat_history)
+                response = future.result()
                 self.chat_history.append({"role": "user", "content": user_msg})
                 self.chat_history.append({"role": "assistant", "content": response})
             except Exception as e:
-                error_details = traceback.format_exc()
+                error_details = "".join(traceback.format_exception(e))
                 print("[ERROR]", error_details)
                 response = f"[ERROR] {str(e) or 'Unknown error. Check terminal.'}"
 
             # Remove "Typing..." and replace with actual response
             def update_ui():
+                self.pending_request = None
                 if typing_bubble.winfo_exists():
                     typing_bubble.destroy()
                 self.add_bubble(response, "bot")
@@ -118,8 +207,16 @@ class ChatApp(ctk.CTk):
 
             self.after(0, update_ui)
 
+        # Answered on the shared bot event loop; no thread per message
+        self.pending_request = submit_ask(user_msg, self.chat_history)
+        self.pending_request.add_done_callback(on_response)
 
-        threading.Thread(target=run_response, daemon=True).start()
+    def on_close(self):
+        # Abandon the in-flight answer along with its queued or running API calls
+        if self.pending_request is not None:
+            self.pending_request.cancel()
+        self.suggest_pool.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
 
     def add_bubble(self, msg, sender):
         bubble_color = "#0084FF" if sender == "user" else "#E4E6EB"
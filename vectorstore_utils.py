@@ -2,109 +2,511 @@
 
 import os
 import uuid
+import shutil
 import hashlib
+import queue
+import threading
 from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 from langchain_community.vectorstores import Chroma
 from langchain_cohere import CohereEmbeddings
 from langchain_core.documents import Document
-from db import load_all_documents
+from db import iter_documents, iter_parents, load_parents, product_parent_id, record_digest, ParentsWriter
+from api_scheduler import ScheduledEmbeddings, api_priority, BACKGROUND
+from local_index import LOCAL_INDEX_MODE, INDEX_DIRNAME, export_local_index, load_local_index
+from name_index import build_name_index, load_name_index
+from facet_index import FacetIndex
+from autocomplete import NameCompleter
 
 # === Constants ===
-CHROMA_PATH = "chroma_db"
+CHROMA_PATH = "chroma_db"                 # legacy single-directory store
+VERSIONS_PATH = "chroma_versions"         # blue/green versioned stores
+CURRENT_POINTER = os.path.join(VERSIONS_PATH, "CURRENT")
+KEEP_VERSIONS = 3                         # newest versions kept on disk for other processes
+PIPELINE_BATCH_SIZE = 96                  # chunks per embed + upsert batch
+PIPELINE_QUEUE_SIZE = 8                   # batches buffered between pipeline stages
+EMBED_MODEL = "embed-multilingual-v3.0"
 load_dotenv()
 COHERE_TOKEN = os.getenv("COHERE_API_KEY")
 
+# Only one refresh may build a new version at a time
+_build_lock = threading.Lock()
+
 # === Utility Functions ===
 def compute_hash(text: str) -> str:
     return hashlib.md5(text.encode("utf-8")).hexdigest()
 
-def load_vectorstore():
-    embeddings = CohereEmbeddings(
-        cohere_api_key=COHERE_TOKEN,
-        model="embed-multilingual-v3.0"
+def current_version_path() -> str:
+    """Returns the directory of the published store, falling back to the legacy `chroma_db`."""
+    try:
+        name = Path(CURRENT_POINTER).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return CHROMA_PATH
+    path = os.path.join(VERSIONS_PATH, name)
+    return path if os.path.isdir(path) else CHROMA_PATH
+
+def new_version_path() -> str:
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(VERSIONS_PATH, f"v{stamp}-{uuid.uuid4().hex[:6]}")
+
+def publish_version(path: str):
+    """Atomically points CURRENT at `path` (write temp file, then rename over)."""
+    os.makedirs(VERSIONS_PATH, exist_ok=True)
+    tmp = f"{CURRENT_POINTER}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(path))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, CURRENT_POINTER)
+    print(f"[INFO] Published vectorstore version `{path}`")
+
+def validate_vectorstore(store) -> bool:
+    """Cheap sanity check before publishing: non-empty and searchable, without an embedding call."""
+    try:
+        count = store._collection.count()
+        if count == 0:
+            print("[WARN] Validation failed: vectorstore is empty.")
+            return False
+        sample = store._collection.peek(1)
+        hits = store.similarity_search_by_vector(list(sample["embeddings"][0]), k=1)
+        if not hits:
+            print("[WARN] Validation failed: sample search returned nothing.")
+            return False
+        print(f"[INFO] Validated vectorstore ({count} chunks).")
+        return True
+    except Exception as e:
+        print("[WARN] Validation failed:", e)
+        return False
+
+def gc_versions(in_use: set[str] = frozenset()):
+    """Deletes old version directories that are neither current, recent, nor still being read."""
+    if not os.path.isdir(VERSIONS_PATH):
+        return
+    current = os.path.abspath(current_version_path())
+    in_use = {os.path.abspath(p) for p in in_use}
+    versions = sorted(
+        (p for p in Path(VERSIONS_PATH).iterdir() if p.is_dir()),
+        key=lambda p: p.name,
+        reverse=True
     )
+    for path in versions[KEEP_VERSIONS:]:
+        full = os.path.abspath(path)
+        if full == current or full in in_use:
+            continue
+        try:
+            shutil.rmtree(full)
+            print(f"[GC] Removed old vectorstore version `{path}`")
+        except OSError as e:
+            # Files may still be open (e.g. on Windows); retry on the next refresh.
+            print(f"[GC] Could not remove `{path}` yet: {e}")
+
+def make_embeddings():
+    """Cohere embeddings whose requests share the process-wide rate limit and priority queue."""
+    return ScheduledEmbeddings(CohereEmbeddings(
+        cohere_api_key=COHERE_TOKEN,
+        model=EMBED_MODEL
+    ))
+
+def load_vectorstore(path: str | None = None):
+    embeddings = make_embeddings()
     return Chroma(
-        persist_directory=CHROMA_PATH,
+        persist_directory=path or current_version_path(),
         embedding_function=embeddings
     )
 
+# === Live Store Handle ===
+class StoreSnapshot:
+    """One immutable, loaded version of the vectorstore."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.vectorstore = load_vectorstore(path)
+        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 4})
+        self.index = load_local_index(path, self.vectorstore)
+        self.parents = load_parents(path)
+        self.names = load_name_index(path)
+        self._facets = None
+        self._completer = None
+        self.readers = 0
+
+    def parent_document(self, parent_id: str) -> Document | None:
+        parent = self.parents.get(parent_id)
+        if not parent:
+            return None
+        metadata = {k: v for k, v in parent.items() if k != "description"}
+        metadata["parent_id"] = parent_id
+        return Document(page_content=parent["description"], metadata=metadata)
+
+    def resolve_parent(self, doc: Document) -> Document:
+        """Maps a retrieved product chunk to its full parent record (legacy chunks map to themselves)."""
+        return self.parent_document(doc.metadata.get("parent_id", "")) or doc
+
+    def product_records(self) -> list[dict]:
+        """One metadata dict per product: parents when present, else the product chunks themselves."""
+        if self.parents:
+            return [
+                {**{k: v for k, v in parent.items() if k != "description"}, "parent_id": parent_id}
+                for parent_id, parent in self.parents.items()
+            ]
+        raw = self.vectorstore._collection.get(include=["metadatas"])
+        return [m for m in raw["metadatas"] if m.get("type") == "product"]
+
+    @property
+    def facets(self) -> FacetIndex:
+        """Category/grade/pack/price facets over this snapshot's products, built on first use."""
+        if self._facets is None:
+            self._facets = FacetIndex(self.product_records())
+        return self._facets
+
+    @property
+    def completer(self) -> NameCompleter:
+        """Product-name typeahead index for this snapshot, built on first use."""
+        if self._completer is None:
+            self._completer = NameCompleter([r.get("name", "") for r in self.facets.records])
+        return self._completer
+
+    def similarity_search_by_vector(self, query_vector, k: int = 4, filter: dict | None = None) -> list[Document]:
+        if self.index is not None:
+            return self.index.similarity_search_by_vector(query_vector, k=k, filter=filter)
+        return self.vectorstore.similarity_search_by_vector(query_vector, k=k, filter=filter)
+
+    def search_with_vectors(self, query_vector, k: int, filter: dict | None = None) -> tuple[list[Document], list]:
+        """Top-k documents plus their stored embeddings, for reranking the candidate pool."""
+        if self.index is not None:
+            rows = [row for row, _ in self.index.search(query_vector, k, filter)]
+            return [self.index.document(row) for row in rows], self.index.vectors_for(rows)
+        k = min(k, self.vectorstore._collection.count())
+        if k == 0:
+            return [], []
+        result = self.vectorstore._collection.query(
+            query_embeddings=[list(query_vector)],
+            n_results=k,
+            where=filter or None,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        docs = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(result["documents"][0], result["metadatas"][0])
+        ]
+        return docs, result["embeddings"][0]
+
+
+class LiveStore:
+    """
+    Read-copy-update handle over the published vectorstore.
+    Queries pin a snapshot for their whole duration; a swap only replaces the
+    reference, so in-flight queries finish on the version they started with.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current: StoreSnapshot | None = None
+        self._retired: list[StoreSnapshot] = []
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            if self._current is None:
+                self._current = StoreSnapshot(current_version_path())
+            snap = self._current
+            snap.readers += 1
+        try:
+            yield snap
+        finally:
+            with self._lock:
+                snap.readers -= 1
+                self._retired = [s for s in self._retired if s.readers > 0]
+
+    def is_loaded(self) -> bool:
+        return self._current is not None
+
+    def ensure_loaded(self):
+        """Loads the published snapshot now, so a later acquire() doesn't touch disk under the lock."""
+        if self._current is not None:
+            return
+        snap = StoreSnapshot(current_version_path())
+        with self._lock:
+            if self._current is None:
+                self._current = snap
+
+    def swap(self, path: str):
+        # Load outside the lock so readers never wait on disk I/O
+        new_snap = StoreSnapshot(path)
+        with self._lock:
+            old = self._current
+            self._current = new_snap
+            if old is not None and old.readers > 0:
+                self._retired.append(old)
+        print(f"[INFO] Live vectorstore switched to `{path}`")
+
+    def reload(self):
+        self.swap(current_version_path())
+
+    def current_path(self) -> str | None:
+        with self._lock:
+            return self._current.path if self._current else None
+
+    def after_fork(self):
+        """
+        Called in a forked worker: gives it its own Chroma client (SQLite handles must not be
+        shared across processes) while the mmap'd index and parsed parents stay shared.
+        """
+        self._lock = threading.Lock()
+        self._retired = []
+        try:
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        except Exception as e:
+            print("[WARN] Could not reset Chroma client cache after fork:", e)
+        snap = self._current
+        if snap is not None:
+            snap.readers = 0
+            snap.vectorstore = load_vectorstore(snap.path)
+            snap.retriever = snap.vectorstore.as_retriever(search_kwargs={"k": 4})
+
+    def paths_in_use(self) -> set[str]:
+        with self._lock:
+            snaps = ([self._current] if self._current else []) + self._retired
+            return {s.path for s in snaps}
+
+
+live_store = LiveStore()
+
 # === Build Function ===
 def build_vectorstore_if_new():
     if not COHERE_TOKEN:
         raise ValueError("❌ Missing Cohere API Key. Check your .env file.")
 
-    embeddings = CohereEmbeddings(
-        cohere_api_key=COHERE_TOKEN,
-        model="embed-multilingual-v3.0"
-    )
+    # Bulk embedding queues behind interactive chat traffic
+    with _build_lock, api_priority(BACKGROUND):
+        return _build_new_version()
+
+def _build_new_version():
+    embeddings = make_embeddings()
+
+    # Copy the published version into a fresh directory; the live one is never written to
+    base_path = current_version_path()
+    target_path = new_version_path()
+    os.makedirs(VERSIONS_PATH, exist_ok=True)
+    incremental = os.path.isdir(base_path) and any(Path(base_path).iterdir())
+    if incremental:
+        # The local index describes the base's chunks only; a stale copy would hide new ones from
+        # processes that serve with LOCAL_INDEX on (it is exported again below, or on first load)
+        shutil.copytree(base_path, target_path, ignore=shutil.ignore_patterns(INDEX_DIRNAME))
+        vectorstore = Chroma(persist_directory=target_path, embedding_function=embeddings)
+        existing_hashes = existing_document_hashes(vectorstore)
+    else:
+        print(f"📦 Creating new Chroma vectorstore in `{target_path}`...")
+        vectorstore = Chroma(persist_directory=target_path, embedding_function=embeddings)
+        existing_hashes = set()
+
+    # Scraped parent records go straight to disk; carried-over ones are appended afterwards
+    parents = ParentsWriter(target_path)
+    scraped_hashes = set()
 
     print("🌐 Scraping Silvestre website for product and general info...")
-    new_docs = load_all_documents()
-    print(f"📄 Loaded {len(new_docs)} documents")
+    try:
+        stats = stream_into_vectorstore(iter_documents(), vectorstore, embeddings, existing_hashes, parents,
+                                        scraped_hashes)
+    except Exception:
+        parents.abort()
+        shutil.rmtree(target_path, ignore_errors=True)
+        raise
+    print(f"📄 Loaded {stats['loaded']} documents")
+    print(f"🔢 New docs embedded: {stats['added']} ({stats['products']} products, {stats['general']} general)")
 
-    # Remove empty
-    new_docs = [d for d in new_docs if d.page_content.strip()]
-    if not new_docs:
+    if not stats["loaded"]:
         print("❌ No usable documents found after filtering. Aborting.")
+        parents.abort()
+        shutil.rmtree(target_path, ignore_errors=True)
         return None
 
-    # Compute hashes for new docs
-    new_hashes = set(compute_hash(d.page_content) for d in new_docs)
+    # Keep parents of products not rescraped this time (their chunks were carried over).
+    # Prices and attributes live on parents, so a changed record alone is worth publishing
+    scraped = set(parents.summaries)
+    unchanged = set()
+    for parent_id, record in iter_parents(base_path):
+        if parent_id not in scraped:
+            parents.write({parent_id: record})
+        elif parents.digests[parent_id] == record_digest(record):
+            unchanged.add(parent_id)
+    parents_changed = len(unchanged) < len(scraped)
+    del unchanged
 
-    # Load existing hashes from vectorstore
-    if Path(f"{CHROMA_PATH}/index").exists():
-        existing_store = Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings)
-        raw = existing_store._collection.get(include=["documents"])
-        existing_hashes = set(compute_hash(doc) for doc in raw["documents"])
-    else:
-        existing_store = None
-        existing_hashes = set()
-
-    # Find only new docs
-    unique_docs = [doc for doc in new_docs if compute_hash(doc.page_content) not in existing_hashes]
+    pruned = prune_stale_chunks(vectorstore, scraped, scraped_hashes) if incremental else 0
+    print(f"🧹 Removed {pruned} superseded product chunks")
 
-    num_products = sum(1 for d in unique_docs if d.metadata.get("type") == "product")
-    num_general = len(unique_docs) - num_products
-    print(f"🔢 New docs to embed: {len(unique_docs)} ({num_products} products, {num_general} general)")
+    if not stats["added"] and not pruned and not parents_changed:
+        print("📭 No new documents or product changes. Vectorstore unchanged.")
+        parents.abort()
+        shutil.rmtree(target_path, ignore_errors=True)
+        return load_vectorstore(base_path)
 
-    if not unique_docs:
-        print("📭 No new documents to add. Vectorstore unchanged.")
-        return existing_store or load_vectorstore()
-
-    # Add to or create vectorstore
-    if existing_store:
-        print("📥 Adding to existing vectorstore...")
-        existing_store.add_documents(
-            documents=unique_docs,
-            ids=[str(uuid.uuid4()) for _ in unique_docs]
-        )
-        existing_store.persist()
-        vectorstore = existing_store
-    else:
-        print("📦 Creating new Chroma vectorstore...")
-        Chroma.from_documents(
-            documents=unique_docs,
-            embedding=embeddings,
-            ids=[str(uuid.uuid4()) for _ in unique_docs],
-            persist_directory=CHROMA_PATH
-        )
-        vectorstore = Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings)
+    vectorstore.persist()
+    parents.close()
+    try:
+        build_name_index(target_path, parents.summaries, embeddings, previous_path=base_path)
+    except Exception as e:
+        print("[WARN] Could not build product name index:", e)
 
-    print(f"✅ Vectorstore updated and saved to `{CHROMA_PATH}/`")
+    if not validate_vectorstore(vectorstore):
+        shutil.rmtree(target_path, ignore_errors=True)
+        raise RuntimeError("New vectorstore version failed validation; live store left unchanged.")
 
-    raw = vectorstore._collection.get(include=["documents", "metadatas"])
-    print("📦 Final saved chunk count:", len(raw["documents"]))
+    raw = vectorstore._collection.get(include=["metadatas"])
+    print("📦 Final saved chunk count:", len(raw["metadatas"]))
     types = Counter(m.get("type", "unknown") for m in raw["metadatas"])
     print("📊 Chunk types:", dict(types))
-    
-    # Optional: hot reload for rag_chain
+
+    if LOCAL_INDEX_MODE != "off":
+        export_local_index(vectorstore, target_path)
+
+    publish_version(target_path)
+    print(f"✅ Vectorstore updated and saved to `{target_path}/`")
+
+    # Hot swap for in-process queries; old versions are collected once unused
     try:
-        from rag_chain import reload_vectorstore
-        reload_vectorstore()
+        live_store.swap(target_path)
     except Exception as e:
-        print("[WARN] Could not reload vectorstore in rag_chain:", e)
-
+        print("[WARN] Could not swap live vectorstore:", e)
+    gc_versions(live_store.paths_in_use())
 
     return vectorstore
+
+# === Streaming ingestion ===
+_DONE = object()
+HASH_PAGE_SIZE = 1000
+
+def existing_document_hashes(vectorstore) -> set[str]:
+    """Hashes of every stored chunk, read a page at a time so all documents are never in memory."""
+    hashes = set()
+    offset = 0
+    while True:
+        raw = vectorstore._collection.get(include=["documents"], limit=HASH_PAGE_SIZE, offset=offset)
+        hashes.update(compute_hash(doc) for doc in raw["documents"])
+        if len(raw["documents"]) < HASH_PAGE_SIZE:
+            return hashes
+        offset += HASH_PAGE_SIZE
+
+def prune_stale_chunks(vectorstore, scraped: set[str], scraped_hashes: set[str]) -> int:
+    """
+    Deletes product chunks this refresh superseded: children of a rescraped product whose text
+    is no longer produced, and legacy chunks without a parent_id whose product was rescraped.
+    """
+    stale = []
+    offset = 0
+    while True:
+        raw = vectorstore._collection.get(include=["documents", "metadatas"], limit=HASH_PAGE_SIZE, offset=offset)
+        for id_, doc, meta in zip(raw["ids"], raw["documents"], raw["metadatas"]):
+            meta = meta or {}
+            if meta.get("type") != "product":
+                continue
+            parent_id = meta.get("parent_id") or product_parent_id(meta.get("url", ""))
+            if parent_id in scraped and (not meta.get("parent_id") or compute_hash(doc) not in scraped_hashes):
+                stale.append(id_)
+        if len(raw["ids"]) < HASH_PAGE_SIZE:
+            break
+        offset += HASH_PAGE_SIZE
+
+    # Deleted only after the scan, so paging offsets stay valid
+    for start in range(0, len(stale), HASH_PAGE_SIZE):
+        vectorstore._collection.delete(ids=stale[start:start + HASH_PAGE_SIZE])
+    return len(stale)
+
+def stream_into_vectorstore(pages, vectorstore, embeddings, existing_hashes: set[str],
+                            parents: ParentsWriter, scraped_hashes: set[str] | None = None) -> dict:
+    """
+    scrape -> chunk -> embed -> upsert as a pipeline: pages are produced on one thread,
+    embedded here in fixed-size batches, and written by an upsert thread. Bounded queues
+    keep memory flat, and network, embedding and disk writes overlap.
+    Every scraped product record is written to `parents` as it arrives, and every scraped
+    chunk's hash is added to `scraped_hashes` when given.
+    """
+    chunk_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    upsert_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    errors = []
+    stats = {"loaded": 0, "added": 0, "products": 0, "general": 0}
+
+    def produce():
+        try:
+            for chunks, new_parents in pages:
+                parents.write(new_parents)
+                chunk_q.put(chunks)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            chunk_q.put(_DONE)
+
+    def upsert():
+        while True:
+            item = upsert_q.get()
+            if item is _DONE:
+                return
+            if errors:
+                continue          # drain so the embedder never blocks
+            docs, vectors = item
+            try:
+                vectorstore._collection.upsert(
+                    ids=[str(uuid.uuid4()) for _ in docs],
+                    embeddings=vectors,
+                    documents=[d.page_content for d in docs],
+                    metadatas=[d.metadata for d in docs]
+                )
+            except Exception as e:
+                errors.append(e)
+
+    producer = threading.Thread(target=produce, name="ingest-scrape", daemon=True)
+    writer = threading.Thread(target=upsert, name="ingest-upsert", daemon=True)
+    producer.start()
+    writer.start()
+
+    def flush(batch):
+        vectors = embeddings.embed_documents([d.page_content for d in batch])
+        upsert_q.put((batch, vectors))
+        stats["added"] += len(batch)
+        print(f"[PIPELINE] Embedded {stats['added']} new chunks so far")
+
+    batch = []
+    try:
+        while True:
+            chunks = chunk_q.get()
+            if chunks is _DONE:
+                break
+            if errors:
+                continue
+            for doc in chunks:
+                if not doc.page_content.strip():
+                    continue
+                stats["loaded"] += 1
+                digest = compute_hash(doc.page_content)
+                if scraped_hashes is not None:
+                    scraped_hashes.add(digest)
+                if digest in existing_hashes:
+                    continue
+                existing_hashes.add(digest)
+                stats["products" if doc.metadata.get("type") == "product" else "general"] += 1
+                batch.append(doc)
+                if len(batch) >= PIPELINE_BATCH_SIZE:
+                    flush(batch)
+                    batch = []
+        if batch and not errors:
+            flush(batch)
+    except Exception as e:
+        errors.append(e)
+        # Unblock the producer so its thread can finish
+        while producer.is_alive():
+            try:
+                chunk_q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+    finally:
+        upsert_q.put(_DONE)
+        writer.join()
+        producer.join()
+
+    if errors:
+        raise errors[0]
+    return stats